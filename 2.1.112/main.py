@@ -1,14 +1,3501 @@
 import sys
 import os
-from PyQt5.QtCore import QUrl, Qt, QSize, QStandardPaths
-from PyQt5.QtGui import QIcon, QKeySequence, QPixmap
+import json
+import time
+import atexit
+import re
+import queue
+import heapq
+import bisect
+import random
+import signal
+import sqlite3
+import hashlib
+import itertools
+import ipaddress
+import threading
+import traceback
+from datetime import datetime
+from collections import deque, OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote_plus, urlsplit
+from PyQt5 import sip
+from PyQt5.QtCore import (QUrl, Qt, QSize, QStandardPaths, QObject, QTimer,
+                          pyqtSignal, QModelIndex, QEvent, QBuffer, QIODevice,
+                          QPropertyAnimation, QAbstractListModel, QRect, QMimeData)
+from PyQt5.QtGui import (QIcon, QKeySequence, QPixmap, QStandardItem, QStandardItemModel,
+                         QDrag, QCursor, QMouseEvent, QColor, QPainter)
 from PyQt5.QtWidgets import (QApplication, QLineEdit, QVBoxLayout, QWidget,
                              QTabWidget, QToolBar, QMainWindow, QAction,
                              QMenuBar, QShortcut, QSizePolicy, QLabel, 
                              QHBoxLayout, QFrame, QToolButton, QTextEdit, QDialog,
-                             QVBoxLayout, QPushButton, QMenu)
-from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEngineProfile, QWebEnginePage
-from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkRequest
+                             QVBoxLayout, QPushButton, QMenu, QMessageBox,
+                             QTableWidget, QTableWidgetItem, QAbstractItemView, QHeaderView,
+                             QCompleter, QListWidget, QListWidgetItem, QGraphicsOpacityEffect,
+                             QListView, QStyledItemDelegate, QStyle, QDockWidget, QTabBar,
+                             QInputDialog, QActionGroup)
+from PyQt5.QtWebEngineWidgets import (QWebEngineView, QWebEngineProfile, QWebEnginePage,
+                                      QWebEngineScript)
+from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkRequest, QNetworkReply, QHostInfo
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def env_number(name, default):
+    """Numeric setting from the environment, falling back to default"""
+    try:
+        return type(default)(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+# Every tab gets a process-unique id used by diagnostics (traces, logs, metrics)
+_tab_ids = itertools.count(1)
+
+
+class NavigationTracer:
+    """Records navigation spans and writes them as Chrome trace-event JSON.
+
+    Enabled by pointing the NEXIUM_TRACE environment variable at an output
+    file; the resulting JSON can be opened in Perfetto or chrome://tracing.
+    When disabled, call sites check `enabled` and skip all work.
+    """
+
+    MAX_EVENTS = 200000
+
+    def __init__(self, path=None):
+        self.path = path
+        self.enabled = bool(path)
+        self.events = deque(maxlen=self.MAX_EVENTS)
+        self.pid = os.getpid()
+        self._span_ids = itertools.count(1)
+        self._named_tabs = set()
+
+    @staticmethod
+    def now():
+        """Current trace timestamp in microseconds"""
+        return time.perf_counter_ns() // 1000
+
+    def _name_tab(self, tab_id):
+        # Remembered separately so the labels survive the event buffer wrapping
+        self._named_tabs.add(tab_id)
+
+    def begin(self, name, tab_id, **args):
+        """Open an async span on the tab's track and return its id"""
+        span_id = next(self._span_ids)
+        self._name_tab(tab_id)
+        self.events.append({"name": name, "cat": "navigation", "ph": "b", "ts": self.now(),
+                            "pid": self.pid, "tid": tab_id, "id": span_id, "args": args})
+        return span_id
+
+    def end(self, name, span_id, tab_id, **args):
+        """Close a span previously opened with begin()"""
+        self.events.append({"name": name, "cat": "navigation", "ph": "e", "ts": self.now(),
+                            "pid": self.pid, "tid": tab_id, "id": span_id, "args": args})
+
+    def instant(self, name, tab_id, span_id=None, **args):
+        """Record a point event, attached to a span when one is open"""
+        self._name_tab(tab_id)
+        event = {"name": name, "cat": "navigation", "ts": self.now(),
+                 "pid": self.pid, "tid": tab_id, "args": args}
+        if span_id is None:
+            event.update(ph="i", s="t")
+        else:
+            event.update(ph="n", id=span_id)
+        self.events.append(event)
+
+    def complete(self, name, tab_id, start_ts, **args):
+        """Record a synchronous slice that started at start_ts and ends now"""
+        self._name_tab(tab_id)
+        self.events.append({"name": name, "cat": "navigation", "ph": "X", "ts": start_ts,
+                            "dur": self.now() - start_ts, "pid": self.pid, "tid": tab_id,
+                            "args": args})
+
+    def write(self):
+        """Dump collected events to the trace file"""
+        if not self.enabled or not self.events:
+            return
+        # Label each tab's track so Perfetto shows "Tab N" instead of a bare id
+        names = [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tab_id,
+                  "args": {"name": f"Tab {tab_id}"}} for tab_id in sorted(self._named_tabs)]
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": names + list(self.events), "displayTimeUnit": "ms"}, f)
+        except OSError as e:
+            print("Failed to write trace:", e)
+
+
+tracer = NavigationTracer(os.environ.get("NEXIUM_TRACE"))
+if tracer.enabled:
+    atexit.register(tracer.write)
+
+
+def process_memory(pid):
+    """Resident set size of a process in bytes, or None if it can't be read"""
+    if not pid:
+        return None
+    try:
+        if psutil:
+            return psutil.Process(pid).memory_info().rss
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+
+
+def process_cpu_time(pid):
+    """User plus system CPU seconds used by a process, or None"""
+    if not pid:
+        return None
+    try:
+        if psutil:
+            times = psutil.Process(pid).cpu_times()
+            return times.user + times.system
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except Exception:
+        return None
+
+
+def directory_size(path):
+    """Total size in bytes of all files below path"""
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class LatencyHistogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def render(self, name):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum {self.sum:.6f}")
+        lines.append(f"{name}_count {self.count}")
+        return lines
+
+
+class BrowserMetrics:
+    """Thread-safe store of browser counters and gauges.
+
+    The GUI thread only records cheap values (counters, a list of renderer
+    pids); anything that touches the disk or other processes is gathered
+    by the scraping thread in render().
+    """
+
+    CACHE_SIZE_TTL = 60
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.renderer_pids = ()
+        self.cache_path = None
+        self.load_latency = LatencyHistogram((0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+        self._cache_size = (0.0, 0)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def observe_load(self, seconds):
+        with self.lock:
+            self.load_latency.observe(seconds)
+
+    def cache_size(self):
+        # Walking the cache is slow on big profiles, so reuse recent results
+        checked, size = self._cache_size
+        if self.cache_path and time.monotonic() - checked > self.CACHE_SIZE_TTL:
+            size = directory_size(self.cache_path)
+            self._cache_size = (time.monotonic(), size)
+        return size
+
+    def render(self):
+        """Prometheus text exposition of all metrics (called off the GUI thread)"""
+        with self.lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            pids = self.renderer_pids
+            histogram = self.load_latency.render("nexium_page_load_seconds")
+
+        renderer_memory = sum(filter(None, (process_memory(pid) for pid in pids)))
+        gauges["nexium_renderer_processes"] = len(pids)
+        gauges["nexium_renderer_memory_bytes"] = renderer_memory
+        gauges["nexium_browser_memory_bytes"] = process_memory(os.getpid()) or 0
+        gauges["nexium_cache_size_bytes"] = self.cache_size()
+
+        lines = []
+        for name, value in sorted(gauges.items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        seen = set()
+        for (name, labels), value in sorted(counters.items()):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {name} counter")
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        lines.append("# TYPE nexium_page_load_seconds histogram")
+        lines.extend(histogram)
+        return "\n".join(lines) + "\n"
+
+
+metrics = BrowserMetrics()
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_exporter(port):
+    """Serve /metrics on localhost from a daemon thread"""
+    try:
+        server = ThreadingHTTPServer(("127.0.0.1", port), MetricsRequestHandler)
+    except OSError as e:
+        print("Failed to start metrics exporter:", e)
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return server
+
+
+class StallMonitor(QObject):
+    """Counts event-loop stalls by measuring how late a repeating timer fires"""
+
+    INTERVAL_MS = 100
+    STALL_THRESHOLD = 0.25
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.last_tick = time.monotonic()
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.tick)
+        self.timer.start(self.INTERVAL_MS)
+
+    def tick(self):
+        now = time.monotonic()
+        lateness = now - self.last_tick - self.INTERVAL_MS / 1000
+        self.last_tick = now
+        if lateness > self.STALL_THRESHOLD:
+            metrics.inc("nexium_event_loop_stalls_total")
+            metrics.inc("nexium_event_loop_stall_seconds_total", round(lateness, 3))
+
+
+class FlightRecorder:
+    """Always-on ring buffer of recent browser events.
+
+    Entries are small tuples and the buffer has a fixed length, so
+    recording costs a deque append. The buffer is written to a file under
+    the storage path when something goes wrong, and old dumps are pruned.
+    """
+
+    MAX_ENTRIES = 4000
+    MAX_TEXT = 500
+    MAX_DUMPS = 20
+    MIN_DUMP_INTERVAL = 10
+
+    def __init__(self):
+        self.entries = deque(maxlen=self.MAX_ENTRIES)
+        self.dump_dir = None
+        self.last_dump = 0.0
+
+    def record(self, kind, tab_id, text=""):
+        self.entries.append((time.time(), kind, tab_id, str(text)[:self.MAX_TEXT]))
+
+    def dump(self, reason, force=False):
+        """Write the buffer to disk and return the file path"""
+        now = time.monotonic()
+        if not self.dump_dir or (not force and now - self.last_dump < self.MIN_DUMP_INTERVAL):
+            return None
+        self.last_dump = now
+        path = os.path.join(self.dump_dir,
+                            f"flight-{datetime.now():%Y%m%d-%H%M%S}-{reason}.log")
+        try:
+            os.makedirs(self.dump_dir, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"Nexium flight recorder dump ({reason})\n")
+                for stamp, kind, tab_id, text in list(self.entries):
+                    moment = datetime.fromtimestamp(stamp).isoformat(timespec="milliseconds")
+                    f.write(f"{moment} tab={tab_id} {kind}: {text}\n")
+            self.prune()
+        except OSError as e:
+            print("Failed to write flight recorder dump:", e)
+            return None
+        return path
+
+    def prune(self):
+        dumps = sorted(name for name in os.listdir(self.dump_dir) if name.startswith("flight-"))
+        for name in dumps[:-self.MAX_DUMPS]:
+            try:
+                os.remove(os.path.join(self.dump_dir, name))
+            except OSError:
+                pass
+
+
+flight_recorder = FlightRecorder()
+
+
+def record_unhandled_exception(exc_type, exc_value, exc_traceback):
+    """sys.excepthook that keeps the flight recorder in the loop"""
+    text = "".join(traceback.format_exception(exc_type, exc_value, exc_traceback))
+    flight_recorder.record("exception", 0, text[-FlightRecorder.MAX_TEXT:])
+    flight_recorder.dump("exception", force=True)
+    sys.__excepthook__(exc_type, exc_value, exc_traceback)
+
+
+class NexiumPage(QWebEnginePage):
+    """Web page that reports console output to the flight recorder.
+
+    Windows the page asks for (window.open, target=_blank) are created by
+    the browser window showing it. A page made for a background tab can
+    hold off its first navigation until the load scheduler lets it go.
+    """
+
+    load_deferred = pyqtSignal(QUrl)
+
+    tab_id = 0
+    container = None
+    browser_window = None
+    defer_first_load = False
+    deferred_url = None
+
+    def javaScriptConsoleMessage(self, level, message, line_number, source_id):
+        flight_recorder.record("console", self.tab_id, f"{source_id}:{line_number} {message}")
+
+    def createWindow(self, window_type):
+        if self.browser_window is None:
+            return None
+        return self.browser_window.create_window_page(self, window_type)
+
+    def acceptNavigationRequest(self, url, navigation_type, is_main_frame):
+        if self.defer_first_load and is_main_frame:
+            self.defer_first_load = False
+            self.deferred_url = url
+            self.load_deferred.emit(url)
+            return False
+        return super().acceptNavigationRequest(url, navigation_type, is_main_frame)
+
+
+class SparePagePool(QObject):
+    """A couple of pages built ahead of time for new tabs.
+
+    Building a page is a noticeable part of opening a tab, and a page
+    asking for a new window needs one on the spot. Pages that are taken
+    are replaced once things have been quiet for a second.
+    """
+
+    SIZE = 2
+    REFILL_DELAY_MS = 1000
+
+    def __init__(self, profile, parent=None):
+        super().__init__(parent)
+        self.profile = profile
+        self.pages = []
+        self.refill_timer = QTimer(self)
+        self.refill_timer.setSingleShot(True)
+        self.refill_timer.timeout.connect(self.refill)
+        self.refill_timer.start(self.REFILL_DELAY_MS)
+
+    def take(self):
+        page = self.pages.pop() if self.pages else NexiumPage(self.profile)
+        self.refill_timer.start(self.REFILL_DELAY_MS)
+        return page
+
+    def refill(self):
+        while len(self.pages) < self.SIZE:
+            self.pages.append(NexiumPage(self.profile, self))
+
+
+class LoadScheduler(QObject):
+    """Lets deferred background tabs load a few at a time.
+
+    Tabs opened in the background start out empty and load when they are
+    first shown or when one of a small number of background load slots
+    frees up, so a burst of middle-clicks doesn't start a dozen pages at
+    once. A load that hasn't finished after a while gives up its slot.
+    """
+
+    SLOT_TIMEOUT_MS = 30000
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        self.max_loads = int(env_number("NEXIUM_BACKGROUND_LOADS", 2))
+        self.waiting = deque()
+        self.loading = set()
+
+    def defer(self, tab):
+        """Hold off the tab's first navigation until it is admitted"""
+        tab.page.defer_first_load = True
+        tab.page.load_deferred.connect(lambda url: self.enqueue(tab, url))
+
+    def enqueue(self, tab, url):
+        self.window.tab_updates.mark(tab, "title", url.toString())
+        if tab is self.window.tabs.currentWidget():
+            self.start(tab)
+        else:
+            self.waiting.append(tab)
+            self.admit()
+
+    def tab_activated(self, index):
+        if (tab := self.window.tabs.widget(index)) and tab.page.deferred_url is not None:
+            if tab in self.waiting:
+                self.waiting.remove(tab)
+            self.start(tab)
+
+    def admit(self):
+        while self.waiting and len(self.loading) < self.max_loads:
+            self.start(self.waiting.popleft())
+
+    def start(self, tab):
+        url, tab.page.deferred_url = tab.page.deferred_url, None
+        if url is None:
+            return
+        self.loading.add(tab)
+        
+        def release(ok=True):
+            if tab in self.loading:
+                self.loading.discard(tab)
+                tab.page.loadFinished.disconnect(release)
+                self.admit()
+        tab.page.loadFinished.connect(release)
+        QTimer.singleShot(self.SLOT_TIMEOUT_MS, release)
+        tab.browser.setUrl(url)
+
+    def forget(self, tab):
+        if tab in self.waiting:
+            self.waiting.remove(tab)
+        if tab in self.loading:
+            self.loading.discard(tab)
+            self.admit()
+
+
+class RendererWatchdog(QObject):
+    """Restores crashed tabs and reins in runaway renderers.
+
+    Crashed or killed renderers are reloaded after an exponential backoff
+    so a page that crashes on load can't spin. Every few seconds each
+    renderer's RSS and CPU use is sampled across all windows, since a
+    renderer can serve tabs in several; one over its limits for a
+    sustained period has its background tabs discarded and the visible
+    ones reloaded. An optional total budget discards the least recently
+    used background tabs once all renderers together exceed it.
+    """
+
+    SAMPLE_INTERVAL_MS = 5000
+    BACKOFF_BASE_MS = 1000
+    BACKOFF_MAX_MS = 300000
+    CRASH_MEMORY = 600
+
+    def __init__(self, context):
+        super().__init__(context)
+        self.context = context
+        self.memory_limit = env_number("NEXIUM_RENDERER_MEMORY_LIMIT_MB", 2048) * 1048576
+        self.total_memory_limit = env_number("NEXIUM_RENDERER_TOTAL_MEMORY_MB", 0) * 1048576
+        self.cpu_limit = env_number("NEXIUM_RENDERER_CPU_LIMIT", 90.0)
+        self.sustain_seconds = env_number("NEXIUM_RENDERER_LIMIT_SECONDS", 60)
+        self.cpu_samples = {}
+        self.over_limit_since = {}
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.sample)
+        self.timer.start(self.SAMPLE_INTERVAL_MS)
+
+    def watch(self, tab):
+        tab.crash_count = 0
+        tab.last_crash = 0.0
+        tab.last_active = time.monotonic()
+        tab.page.renderProcessTerminated.connect(
+            lambda status, exit_code: self.render_process_terminated(tab, status))
+
+    def tab_activated(self, window, index):
+        if tab := window.tabs.widget(index):
+            tab.last_active = time.monotonic()
+
+    @staticmethod
+    def is_visible(tab):
+        window = tab.page.browser_window
+        return window is not None and tab is window.tabs.currentWidget()
+
+    def render_process_terminated(self, tab, status):
+        if status == QWebEnginePage.NormalTerminationStatus:
+            return
+        now = time.monotonic()
+        if now - tab.last_crash > self.CRASH_MEMORY:
+            tab.crash_count = 0
+        tab.crash_count += 1
+        tab.last_crash = now
+        if getattr(tab, "restore_immediately", False):
+            tab.restore_immediately = False
+            delay = 0
+        else:
+            delay = min(self.BACKOFF_BASE_MS * 2 ** (tab.crash_count - 1), self.BACKOFF_MAX_MS)
+        flight_recorder.record("watchdog", tab.tab_id, f"restoring in {delay}ms "
+                               f"(crash #{tab.crash_count})")
+        QTimer.singleShot(delay, lambda: self.restore(tab))
+
+    def restore(self, tab):
+        # The tab may have been closed, or moved to another window, while we were backing off
+        window = tab.page.browser_window
+        if window is None or window.tabs.indexOf(tab) < 0:
+            return
+        metrics.inc("nexium_watchdog_actions_total", action="restore")
+        tab.browser.reload()
+
+    def sample(self):
+        """Check every renderer against the configured limits"""
+        now = time.monotonic()
+        tabs_by_pid = {}
+        for tab in self.context.all_tabs():
+            if pid := tab.page.renderProcessPid():
+                tabs_by_pid.setdefault(pid, []).append(tab)
+
+        total_rss = 0
+        for pid, tabs in tabs_by_pid.items():
+            rss = process_memory(pid) or 0
+            total_rss += rss
+            cpu_percent = self.cpu_percent(pid, now)
+            if rss > self.memory_limit or cpu_percent > self.cpu_limit:
+                since = self.over_limit_since.setdefault(pid, now)
+                if now - since >= self.sustain_seconds:
+                    del self.over_limit_since[pid]
+                    flight_recorder.record("watchdog", tabs[0].tab_id,
+                                           f"renderer {pid} over limits: "
+                                           f"{rss // 1048576}MB, {cpu_percent:.0f}% CPU")
+                    for tab in tabs:
+                        self.recycle(tab)
+            else:
+                self.over_limit_since.pop(pid, None)
+
+        for pid in set(self.cpu_samples) - set(tabs_by_pid):
+            del self.cpu_samples[pid]
+        for pid in set(self.over_limit_since) - set(tabs_by_pid):
+            del self.over_limit_since[pid]
+
+        if self.total_memory_limit and total_rss > self.total_memory_limit:
+            self.discard_least_recently_used()
+
+    def cpu_percent(self, pid, now):
+        cpu_time = process_cpu_time(pid)
+        if cpu_time is None:
+            return 0.0
+        previous = self.cpu_samples.get(pid)
+        self.cpu_samples[pid] = (now, cpu_time)
+        if not previous or now <= previous[0]:
+            return 0.0
+        return 100.0 * (cpu_time - previous[1]) / (now - previous[0])
+
+    def recycle(self, tab):
+        """Free a tab's renderer memory: reload it if visible, otherwise discard it"""
+        if self.is_visible(tab):
+            metrics.inc("nexium_watchdog_actions_total", action="reload")
+            tab.browser.reload()
+        else:
+            self.discard(tab)
+
+    def discard(self, tab):
+        # Discarded pages are reloaded by Qt as soon as they become visible again
+        if tab.page.lifecycleState() == QWebEnginePage.LifecycleState.Discarded:
+            return
+        metrics.inc("nexium_watchdog_actions_total", action="discard")
+        flight_recorder.record("watchdog", tab.tab_id, "discarded")
+        tab.page.setLifecycleState(QWebEnginePage.LifecycleState.Discarded)
+
+    def discard_least_recently_used(self):
+        candidates = [tab for tab in self.context.all_tabs() if not self.is_visible(tab) and
+                      tab.page.lifecycleState() != QWebEnginePage.LifecycleState.Discarded]
+        if candidates:
+            self.discard(min(candidates, key=lambda tab: tab.last_active))
+
+
+class HangDetector(QObject):
+    """Spots hung renderers by timing a trivial script in each visible tab.
+
+    A page busy in an endless JavaScript loop never answers the ping, so a
+    tab whose ping stays unanswered past the threshold is flagged and the
+    user is offered to kill its renderer and reload it. One detector
+    covers every window; its prompt follows the tab if it is dragged to
+    another one.
+    """
+
+    PING_INTERVAL_MS = 2000
+    LATENCY_SAMPLES = 60
+
+    def __init__(self, context):
+        super().__init__(context)
+        self.context = context
+        self.hang_threshold = env_number("NEXIUM_HANG_SECONDS", 5.0)
+        self.prompts = {}
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.ping_visible_tabs)
+        self.timer.start(self.PING_INTERVAL_MS)
+
+    def watch(self, tab):
+        tab.js_latency = deque(maxlen=self.LATENCY_SAMPLES)
+        tab.ping_sent = None
+        tab.ping_token = 0
+        tab.hung = False
+        # A new document or renderer never answers the old ping
+        tab.page.loadStarted.connect(lambda: self.reset(tab))
+        tab.page.renderProcessTerminated.connect(lambda status, exit_code: self.reset(tab))
+
+    def reset(self, tab):
+        tab.ping_sent = None
+        tab.ping_token += 1
+        self.set_hung(tab, False)
+
+    def ping_visible_tabs(self):
+        now = time.monotonic()
+        for tab in self.context.all_tabs():
+            if not tab.isVisible():
+                continue
+            if tab.ping_sent is not None:
+                if now - tab.ping_sent > self.hang_threshold:
+                    self.set_hung(tab, True)
+                continue
+            tab.ping_sent = now
+            tab.ping_token += 1
+            token = tab.ping_token
+            tab.page.runJavaScript("0", QWebEngineScript.ApplicationWorld,
+                                   lambda result, tab=tab, token=token: self.pong(tab, token))
+
+    def pong(self, tab, token):
+        if token != tab.ping_token or tab.ping_sent is None:
+            return
+        tab.js_latency.append((time.monotonic() - tab.ping_sent) * 1000)
+        tab.ping_sent = None
+        self.set_hung(tab, False)
+
+    def set_hung(self, tab, hung):
+        if hung == tab.hung:
+            return
+        tab.hung = hung
+        if hung:
+            metrics.inc("nexium_hung_pages_total")
+            flight_recorder.record("hung", tab.tab_id, tab.page.url().toString())
+            self.offer_kill(tab)
+        elif prompt := self.prompts.pop(tab.tab_id, None):
+            prompt.close()
+
+    def offer_kill(self, tab):
+        prompt = QMessageBox(QMessageBox.Warning, "Page Unresponsive",
+                             f"\"{tab.page.title() or tab.page.url().toString()}\" "
+                             "is not responding.", QMessageBox.NoButton, tab.page.browser_window)
+        kill_button = prompt.addButton("Kill and Reload", QMessageBox.DestructiveRole)
+        prompt.addButton("Wait", QMessageBox.RejectRole)
+        prompt.setModal(False)
+
+        def handle_choice(button):
+            if self.prompts.get(tab.tab_id) is prompt:
+                del self.prompts[tab.tab_id]
+            window = tab.page.browser_window
+            if button is kill_button and window is not None and window.tabs.indexOf(tab) >= 0:
+                tab.kill_and_reload()
+
+        prompt.buttonClicked.connect(handle_choice)
+        self.prompts[tab.tab_id] = prompt
+        prompt.show()
+
+    def forget(self, tab):
+        """Close the prompt of a tab that is going away"""
+        if prompt := self.prompts.pop(tab.tab_id, None):
+            prompt.close()
+
+    def tab_moved(self, tab):
+        """Reopen an open prompt over the window the tab was moved to"""
+        if prompt := self.prompts.pop(tab.tab_id, None):
+            prompt.close()
+            self.offer_kill(tab)
+
+
+class TaskManager(QDialog):
+    """Lists the tabs of all windows with their renderer, memory use and JavaScript latency"""
+
+    COLUMNS = ["Tab", "Process ID", "Memory", "JS latency (ms)", "Recent pings (ms)", "Status"]
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        self.setWindowTitle("Task Manager")
+        self.setMinimumSize(800, 400)
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(5, 5, 5, 5)
+        
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+        
+        self.kill_button = QPushButton("Kill and Reload")
+        self.kill_button.clicked.connect(self.kill_selected)
+        layout.addWidget(self.kill_button, alignment=Qt.AlignRight)
+        
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000)
+        self.refresh()
+
+    def tabs(self):
+        return list(self.window.context.all_tabs())
+
+    def refresh(self):
+        tabs = self.tabs()
+        self.table.setRowCount(len(tabs))
+        for row, tab in enumerate(tabs):
+            pid = tab.page.renderProcessPid()
+            rss = process_memory(pid)
+            latency = list(tab.js_latency)
+            if latency:
+                summary = (f"{latency[-1]:.1f} (avg {sum(latency) / len(latency):.1f}, "
+                           f"max {max(latency):.1f})")
+            else:
+                summary = "-"
+            if tab.hung:
+                status = "Not responding"
+            elif tab.page.lifecycleState() == QWebEnginePage.LifecycleState.Discarded:
+                status = "Discarded"
+            else:
+                status = "Running"
+            values = [tab.page.title() or tab.page.url().toString(),
+                      str(pid or "-"),
+                      f"{rss / 1048576:.0f} MB" if rss else "-",
+                      summary,
+                      " ".join(f"{value:.0f}" for value in latency[-10:]),
+                      status]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+
+    def kill_selected(self):
+        tabs = self.tabs()
+        for index in self.table.selectionModel().selectedRows():
+            if index.row() < len(tabs):
+                tabs[index.row()].kill_and_reload()
+
+
+class HistoryStore(QObject):
+    """Visit history kept in SQLite and written from a worker thread.
+
+    The GUI thread only puts small tuples on a queue. The worker commits
+    them in batches (one transaction per batch, WAL journal) and runs
+    queries whose results come back to the GUI thread through the
+    `results` signal. Old visits are pruned and the file incrementally
+    vacuumed so years of kiosk uptime don't grow the database without
+    bound.
+
+    The text of loaded pages is kept in an FTS5 table (when SQLite has
+    it). Identical text is stored once however many URLs show it, and
+    both the text per page and the number of indexed pages are capped.
+    """
+
+    results = pyqtSignal(object, object)
+    visited = pyqtSignal(str, str)
+    titled = pyqtSignal(str, str)
+
+    BATCH_SIZE = 500
+    BATCH_DELAY = 1.0
+    REVISIT_INTERVAL = 30
+    TITLE_INTERVAL_MS = 5000
+    MAX_VISITS = 200000
+    MAINTENANCE_INTERVAL_MS = 24 * 3600 * 1000
+    RECORDED_SCHEMES = ("http", "https", "file")
+    PAGE_TEXT_SCHEMES = ("http", "https")
+    MAX_PAGE_TEXT = 100000
+    MAX_INDEXED_PAGES = 20000
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.retention_days = env_number("NEXIUM_HISTORY_DAYS", 90)
+        self.queue = queue.Queue()
+        self.fts_enabled = True
+        # Cleared if the database can't be opened, so the queue stops growing
+        self.available = True
+        self.results.connect(lambda callback, result: callback(result))
+        self.worker = threading.Thread(target=self.run, name="history-writer", daemon=True)
+        self.worker.start()
+        
+        # Maintenance runs shortly after startup and then once a day
+        QTimer.singleShot(60000, self.maintain)
+        self.maintenance_timer = QTimer(self)
+        self.maintenance_timer.timeout.connect(self.maintain)
+        self.maintenance_timer.start(self.MAINTENANCE_INTERVAL_MS)
+
+    def watch(self, tab):
+        """Record the tab's visits and title updates"""
+        tab.last_visit = (None, 0.0)
+        tab.recorded_title = (None, None)
+        tab.title_pending = False
+        # Titles are recorded at most once per interval, so an animated title
+        # doesn't turn into a stream of database writes
+        tab.title_timer = QTimer(tab)
+        tab.title_timer.setSingleShot(True)
+        tab.title_timer.timeout.connect(lambda: self.title_interval_ended(tab))
+        tab.browser.urlChanged.connect(lambda url: self.record_visit(tab, url))
+        tab.browser.titleChanged.connect(lambda title: self.title_changed(tab))
+        tab.page.loadFinished.connect(lambda ok: self.capture_page_text(tab, ok))
+
+    def record_visit(self, tab, url):
+        if url.scheme() not in self.RECORDED_SCHEMES:
+            return
+        url_text = url.toString(QUrl.RemoveFragment)
+        now = time.time()
+        # Reloads and in-page navigation of the same URL count as one visit
+        last_url, last_time = tab.last_visit
+        if url_text == last_url and now - last_time < self.REVISIT_INTERVAL:
+            return
+        tab.last_visit = (url_text, now)
+        # The title is still the previous page's here; record_title fills it in
+        self.submit(("visit", url_text, "", now, tab.container or ""))
+        self.visited.emit(url_text, "")
+
+    def title_changed(self, tab):
+        if tab.title_timer.isActive():
+            tab.title_pending = True
+        else:
+            self.record_title(tab)
+            tab.title_timer.start(self.TITLE_INTERVAL_MS)
+
+    def title_interval_ended(self, tab):
+        if tab.title_pending:
+            tab.title_pending = False
+            self.record_title(tab)
+            tab.title_timer.start(self.TITLE_INTERVAL_MS)
+
+    def record_title(self, tab):
+        url, title = tab.browser.url(), tab.browser.title()
+        if url.scheme() not in self.RECORDED_SCHEMES or not title:
+            return
+        url_text = url.toString(QUrl.RemoveFragment)
+        # Pages without a title show their URL, which isn't worth storing
+        if title in (url_text, url.toString()) or tab.recorded_title == (url_text, title):
+            return
+        tab.recorded_title = (url_text, title)
+        self.submit(("title", url_text, title))
+        self.titled.emit(url_text, title)
+
+    def capture_page_text(self, tab, ok):
+        """Queue the text of a freshly loaded page for full-text indexing"""
+        url = tab.page.url()
+        if not ok or not self.fts_enabled or url.scheme() not in self.PAGE_TEXT_SCHEMES:
+            return
+        url_text = url.toString(QUrl.RemoveFragment)
+        title = tab.page.title()
+        tab.page.toPlainText(lambda text: self.submit(
+            ("page_text", url_text, title, text[:self.MAX_PAGE_TEXT])))
+
+    @staticmethod
+    def fts_query(text):
+        """FTS5 MATCH expression for free text, treating the last word as a prefix"""
+        words = re.findall(r"\w+", text)
+        if not words:
+            return None
+        return " ".join([f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*'])
+
+    def search_text(self, text, callback, limit=20):
+        """Pages whose text matches, best first, as (url, title, snippet, indexed_at)"""
+        match = self.fts_query(text)
+
+        def search(conn):
+            if not match or not self.fts_enabled:
+                return []
+            return conn.execute("""
+                SELECT i.url, i.title, snippet(page_text, 1, '', '', '\u2026', 12), i.indexed_at
+                FROM page_text JOIN page_index i ON i.content_id = page_text.rowid
+                WHERE page_text MATCH ?
+                ORDER BY bm25(page_text, 5.0, 1.0), i.indexed_at DESC
+                LIMIT ?
+            """, (match, limit)).fetchall()
+
+        self.query(search, callback)
+
+    def recent_visits(self, callback, limit=200):
+        """Most recently visited pages as (url, title, last_visit)"""
+        self.query(lambda conn: conn.execute(
+            "SELECT url, title, last_visit FROM urls ORDER BY last_visit DESC LIMIT ?",
+            (limit,)).fetchall(), callback)
+
+    def save_favicon(self, digest, png, keys, stale_keys=()):
+        """Store a PNG icon once and point the given host/page keys at it"""
+        self.submit(("favicon", digest, png, tuple(keys), tuple(stale_keys)))
+
+    def query(self, fn, callback):
+        """Run fn(connection) on the worker and pass its result to callback on the GUI thread"""
+        self.submit(("query", fn, callback))
+
+    def maintain(self):
+        self.submit(("maintain",))
+
+    def submit(self, op):
+        """Hand an operation to the worker, or drop it once the database is gone"""
+        if self.available:
+            self.queue.put(op)
+        elif op[0] == "query":
+            callback = op[2]
+            QTimer.singleShot(0, lambda: callback(None))
+
+    def close(self):
+        """Flush pending writes and stop the worker"""
+        if self.available:
+            self.queue.put(None)
+            self.worker.join(5)
+
+    def connect_database(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        # auto_vacuum only takes effect before the first table is created
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS urls (
+                id INTEGER PRIMARY KEY,
+                url TEXT UNIQUE NOT NULL,
+                title TEXT NOT NULL DEFAULT '',
+                visit_count INTEGER NOT NULL DEFAULT 0,
+                last_visit REAL NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS visits (
+                id INTEGER PRIMARY KEY,
+                url_id INTEGER NOT NULL REFERENCES urls(id) ON DELETE CASCADE,
+                visit_time REAL NOT NULL,
+                container TEXT NOT NULL DEFAULT ''
+            );
+            CREATE INDEX IF NOT EXISTS visits_time ON visits(visit_time);
+            CREATE INDEX IF NOT EXISTS visits_url ON visits(url_id);
+            CREATE TABLE IF NOT EXISTS page_content (
+                id INTEGER PRIMARY KEY,
+                hash TEXT UNIQUE NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS page_index (
+                url TEXT PRIMARY KEY,
+                content_id INTEGER NOT NULL,
+                title TEXT NOT NULL DEFAULT '',
+                indexed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS page_index_content ON page_index(content_id);
+            CREATE INDEX IF NOT EXISTS page_index_time ON page_index(indexed_at);
+            CREATE TABLE IF NOT EXISTS favicons (
+                hash TEXT PRIMARY KEY,
+                png BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS favicon_keys (
+                key TEXT PRIMARY KEY,
+                hash TEXT NOT NULL
+            );
+        """)
+        # Databases from before containers have no container column yet
+        if "container" not in [row[1] for row in conn.execute("PRAGMA table_info(visits)")]:
+            conn.execute("ALTER TABLE visits ADD COLUMN container TEXT NOT NULL DEFAULT ''")
+        try:
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS page_text USING fts5(title, body)")
+        except sqlite3.OperationalError:
+            print("SQLite has no FTS5 support; page text won't be searchable")
+            self.fts_enabled = False
+        return conn
+
+    def run(self):
+        try:
+            conn = self.connect_database()
+        except Exception as e:
+            print("History database unavailable, history is off:", e)
+            self.available = False
+            # Answer queries that were queued before the failure
+            while not self.queue.empty():
+                op = self.queue.get_nowait()
+                if op is not None and op[0] == "query":
+                    self.results.emit(op[2], None)
+            return
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.BATCH_DELAY
+            while batch[-1] is not None and len(batch) < self.BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                running = False
+                batch.pop()
+            try:
+                with conn:
+                    for op in batch:
+                        try:
+                            self.apply(conn, op)
+                        except Exception as e:
+                            print(f"History {op[0]} failed:", e)
+            except Exception as e:
+                print("History write failed:", e)
+        conn.close()
+
+    def apply(self, conn, op):
+        kind = op[0]
+        if kind == "visit":
+            _, url, title, when, container = op
+            conn.execute("""
+                INSERT INTO urls (url, title, visit_count, last_visit) VALUES (?, ?, 1, ?)
+                ON CONFLICT(url) DO UPDATE SET visit_count = visit_count + 1,
+                    last_visit = excluded.last_visit,
+                    title = CASE WHEN excluded.title != '' THEN excluded.title ELSE title END
+            """, (url, title, when))
+            conn.execute("INSERT INTO visits (url_id, visit_time, container) "
+                         "SELECT id, ?, ? FROM urls WHERE url = ?", (when, container, url))
+        elif kind == "title":
+            conn.execute("UPDATE urls SET title = ? WHERE url = ?", (op[2], op[1]))
+        elif kind == "page_text":
+            self.index_page_text(conn, *op[1:])
+        elif kind == "favicon":
+            _, digest, png, keys, stale_keys = op
+            conn.execute("INSERT OR IGNORE INTO favicons (hash, png) VALUES (?, ?)", (digest, png))
+            conn.executemany("INSERT OR REPLACE INTO favicon_keys (key, hash) VALUES (?, ?)",
+                             [(key, digest) for key in keys])
+            conn.executemany("DELETE FROM favicon_keys WHERE key = ?",
+                             [(key,) for key in stale_keys])
+        elif kind == "query":
+            _, fn, callback = op
+            try:
+                result = fn(conn)
+            except Exception as e:
+                print("History query failed:", e)
+                result = None
+            self.results.emit(callback, result)
+        elif kind == "maintain":
+            self.prune(conn)
+
+    def index_page_text(self, conn, url, title, text):
+        text = text.strip()
+        if not text:
+            return
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        now = time.time()
+        previous = conn.execute("""
+            SELECT c.id, c.hash FROM page_index i JOIN page_content c ON c.id = i.content_id
+            WHERE i.url = ?
+        """, (url,)).fetchone()
+        if previous and previous[1] == digest:
+            conn.execute("UPDATE page_index SET title = ?, indexed_at = ? WHERE url = ?",
+                         (title, now, url))
+            return
+        
+        # Pages with identical text share one full-text row
+        if content := conn.execute("SELECT id FROM page_content WHERE hash = ?",
+                                   (digest,)).fetchone():
+            content_id = content[0]
+        else:
+            content_id = conn.execute("INSERT INTO page_content (hash, size) VALUES (?, ?)",
+                                      (digest, len(text))).lastrowid
+            conn.execute("INSERT INTO page_text (rowid, title, body) VALUES (?, ?, ?)",
+                         (content_id, title, text))
+        conn.execute("""
+            INSERT INTO page_index (url, content_id, title, indexed_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET content_id = excluded.content_id,
+                title = excluded.title, indexed_at = excluded.indexed_at
+        """, (url, content_id, title, now))
+        if previous:
+            self.drop_unreferenced_content(conn, "id = ?", (previous[0],))
+
+    def drop_unreferenced_content(self, conn, where="1", params=()):
+        orphans = f"""
+            SELECT id FROM page_content WHERE {where}
+            AND id NOT IN (SELECT content_id FROM page_index)
+        """
+        conn.execute(f"DELETE FROM page_text WHERE rowid IN ({orphans})", params)
+        conn.execute(f"DELETE FROM page_content WHERE id IN ({orphans})", params)
+
+    def prune(self, conn):
+        """Apply the retention policy and give freed pages back to the filesystem"""
+        cutoff = time.time() - self.retention_days * 86400
+        conn.execute("DELETE FROM visits WHERE visit_time < ?", (cutoff,))
+        conn.execute("""
+            DELETE FROM visits WHERE id <= (
+                SELECT id FROM visits ORDER BY id DESC LIMIT 1 OFFSET ?)
+        """, (self.MAX_VISITS,))
+        conn.execute("DELETE FROM urls WHERE id NOT IN (SELECT DISTINCT url_id FROM visits)")
+        conn.execute("""
+            UPDATE urls SET visit_count = (
+                SELECT COUNT(*) FROM visits WHERE visits.url_id = urls.id)
+        """)
+        # Page icons go with their history entry; host icons are kept
+        conn.execute("DELETE FROM favicon_keys WHERE key LIKE '%/%' "
+                     "AND key NOT IN (SELECT url FROM urls)")
+        conn.execute("DELETE FROM favicons WHERE hash NOT IN (SELECT hash FROM favicon_keys)")
+        if self.fts_enabled:
+            conn.execute("DELETE FROM page_index WHERE url NOT IN (SELECT url FROM urls)")
+            conn.execute("""
+                DELETE FROM page_index WHERE indexed_at <= (
+                    SELECT indexed_at FROM page_index ORDER BY indexed_at DESC LIMIT 1 OFFSET ?)
+            """, (self.MAX_INDEXED_PAGES,))
+            self.drop_unreferenced_content(conn)
+            conn.execute("INSERT INTO page_text (page_text) VALUES ('optimize')")
+        conn.commit()
+        conn.execute("PRAGMA incremental_vacuum")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA optimize")
+
+
+HOME_URL = "https://nexucore.github.io/Synax/"
+SEARCH_URL = "https://nexucore.github.io/Synax/?q="
+SUGGEST_URL = "https://nexucore.github.io/Synax/suggest?q={query}"
+
+# Built-in public suffixes: generic and country TLDs, common second-level
+# registries and hosting suffixes, plus names used on private networks.
+# A full public_suffix_list.dat can be loaded over these at startup.
+BUILTIN_PUBLIC_SUFFIXES = """
+com org net edu gov mil int arpa info biz name pro aero coop museum mobi asia tel travel
+jobs cat post app dev page io ai xyz online site store tech blog cloud shop top club live
+news art design email link space website wiki media agency digital network systems
+solutions services world today global group company team studio zone
+
+ac ad ae af ag ai al am ao aq ar as at au aw ax az ba bb bd be bf bg bh bi bj bm bn bo br
+bs bt bw by bz ca cc cd cf cg ch ci ck cl cm cn co cr cu cv cw cx cy cz de dj dk dm do dz
+ec ee eg er es et eu fi fj fk fm fo fr ga gd ge gf gg gh gi gl gm gn gp gq gr gs gt gu gw
+gy hk hm hn hr ht hu id ie il im in iq ir is it je jm jo jp ke kg kh ki km kn kp kr kw ky
+kz la lb lc li lk lr ls lt lu lv ly ma mc md me mg mh mk ml mm mn mo mp mq mr ms mt mu mv
+mw mx my mz na nc ne nf ng ni nl no np nr nu nz om pa pe pf pg ph pk pl pm pn pr ps pt pw
+py qa re ro rs ru rw sa sb sc sd se sg sh si sk sl sm sn so sr ss st su sv sx sy sz tc td
+tf tg th tj tk tl tm tn to tr tt tv tw tz ua ug uk us uy uz va vc ve vg vi vn vu wf ws ye
+yt za zm zw
+
+co.uk org.uk ac.uk gov.uk ltd.uk plc.uk me.uk net.uk sch.uk nhs.uk
+com.au net.au org.au edu.au gov.au co.nz org.nz net.nz govt.nz
+co.jp ne.jp or.jp ac.jp go.jp co.kr or.kr com.cn net.cn org.cn gov.cn edu.cn
+com.hk org.hk com.tw org.tw com.sg edu.sg com.my co.in net.in org.in gov.in ac.in
+com.br net.br org.br gov.br com.ar com.mx org.mx co.za org.za gov.za com.tr org.tr
+com.ua co.il org.il com.eg com.sa com.pk com.ng co.ke
+*.ck !www.ck
+
+github.io gitlab.io herokuapp.com appspot.com blogspot.com netlify.app vercel.app
+pages.dev workers.dev azurewebsites.net cloudfront.net s3.amazonaws.com firebaseapp.com
+web.app
+
+local localhost localdomain lan home home.arpa internal intranet corp test example
+"""
+
+# Suffixes that usually mean a host on the local network, where HTTPS is rare
+PRIVATE_NETWORK_SUFFIXES = frozenset(("local", "localhost", "localdomain", "lan", "home",
+                                      "home.arpa", "internal", "intranet", "corp", "test"))
+
+
+class PublicSuffixTrie:
+    """Public suffix rules compiled into a trie of reversed host labels.
+
+    Supports the rule syntax of publicsuffix.org: plain rules, wildcards
+    ("*.ck") and exceptions ("!www.ck").
+    """
+
+    END = "$"
+    EXCEPTION = "!"
+
+    def __init__(self, rules=()):
+        self.root = {}
+        for rule in rules:
+            self.add(rule)
+
+    @classmethod
+    def from_file(cls, path, trie=None):
+        """Add the rules of a public_suffix_list.dat file"""
+        trie = trie or cls()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                rule = line.split(None, 1)[0] if line.strip() else ""
+                if rule and not rule.startswith("//"):
+                    trie.add(rule)
+        return trie
+
+    def add(self, rule):
+        marker = self.END
+        if rule.startswith("!"):
+            marker = self.EXCEPTION
+            rule = rule[1:]
+        node = self.root
+        for label in reversed(rule.lower().split(".")):
+            node = node.setdefault(label, {})
+        node[marker] = True
+
+    def suffix_length(self, labels):
+        """Number of trailing labels that form the public suffix (0 if none match)"""
+        node = self.root
+        length = 0
+        for depth, label in enumerate(reversed(labels)):
+            child = node.get(label)
+            if child is not None and self.EXCEPTION in child:
+                return depth
+            if child is None:
+                child = node.get("*")
+                if child is None:
+                    break
+            node = child
+            if self.END in node:
+                length = depth + 1
+        return length
+
+
+class UrlResolver:
+    """Decides whether URL bar input is an address or a search.
+
+    Explicit schemes are taken as typed. Otherwise the host part is
+    checked: localhost, IP addresses, anything with a port, single-label
+    hosts followed by a path and hosts seen in history are addresses, as
+    are names ending in a known public suffix. Everything else becomes a
+    Synax search with the query properly encoded.
+    """
+
+    SCHEME_PATTERN = re.compile(r"^([a-zA-Z][a-zA-Z0-9+.-]*):")
+    LABEL_PATTERN = re.compile(r"^[\w-]+$")
+    URL_SCHEMES = frozenset(("http", "https", "file", "ftp", "about", "data", "blob",
+                             "view-source", "chrome", "qrc"))
+
+    def __init__(self, suffixes=None):
+        self.suffixes = suffixes or PublicSuffixTrie(BUILTIN_PUBLIC_SUFFIXES.split())
+        self.known_scheme = lambda host: None
+
+    def resolve(self, text):
+        """URL to load for the given input, or None for blank input"""
+        text = text.strip()
+        if not text:
+            return None
+        if text.startswith("?"):
+            return self.search_url(text[1:].strip())
+        if (match := self.SCHEME_PATTERN.match(text)) and match.group(1).lower() in self.URL_SCHEMES:
+            return text
+        if any(c.isspace() for c in text):
+            return self.search_url(text)
+        scheme = self.address_scheme(text)
+        return f"{scheme}://{text}" if scheme else self.search_url(text)
+
+    def search_url(self, query):
+        return SEARCH_URL + quote_plus(query)
+
+    def address_scheme(self, text):
+        """Scheme to prefix text with if it names a host, else None"""
+        authority, _, path = text.partition("/")
+        for separator in "?#":
+            if separator in authority:
+                authority, _, rest = authority.partition(separator)
+                path = path or rest
+        has_path = "/" in text or bool(path)
+        if not authority or "@" in authority:
+            return None
+        
+        # Split off the port, minding bracketed IPv6 literals
+        host, port = authority, None
+        if authority.startswith("["):
+            host, bracket, port_part = authority[1:].partition("]")
+            if not bracket or (port_part and not port_part.startswith(":")):
+                return None
+            port = port_part[1:] or None
+            try:
+                ipaddress.IPv6Address(host)
+            except ValueError:
+                return None
+            return "http" if port is None or port.isdigit() else None
+        if ":" in authority:
+            host, port = authority.rsplit(":", 1)
+            if not port.isdigit() or int(port) > 65535:
+                return None
+        
+        host = host.lower().rstrip(".")
+        labels = host.split(".")
+        if not host or not all(self.LABEL_PATTERN.match(label) for label in labels):
+            return None
+        if host == "localhost" or host.endswith(".localhost"):
+            return "http"
+        if labels[-1].isdigit():
+            try:
+                ipaddress.IPv4Address(host)
+            except ValueError:
+                return None
+            return "http"
+        if known := self.known_scheme(host):
+            return known
+        
+        suffix_length = self.suffixes.suffix_length(labels)
+        if 0 < suffix_length < len(labels):
+            suffix = ".".join(labels[-suffix_length:])
+            return "http" if suffix in PRIVATE_NETWORK_SUFFIXES else "https"
+        # Intranet names, bare or dotted, count when they carry a port or a path
+        if (port is not None or has_path) and (len(labels) == 1 or suffix_length < len(labels)):
+            return "http"
+        return None
+
+
+url_resolver = UrlResolver()
+
+
+def frecency(visit_count, last_visit, now=None):
+    """Visit count weighted by how recently the page was last visited"""
+    age_days = ((now or time.time()) - last_visit) / 86400
+    for max_age, weight in ((4, 100), (14, 70), (31, 50), (90, 30)):
+        if age_days <= max_age:
+            return visit_count * weight
+    return visit_count * 10
+
+
+class OmniboxEntry:
+    __slots__ = ("url", "key", "title", "visit_count", "last_visit", "score",
+                 "haystack", "tokens", "open_count", "in_top")
+
+    def __init__(self, url, key):
+        self.url = url
+        self.key = key
+        self.title = ""
+        self.visit_count = 0
+        self.last_visit = 0.0
+        self.score = 0
+        self.haystack = ""
+        self.tokens = ()
+        self.open_count = 0
+        self.in_top = False
+
+
+class OmniboxIndex:
+    """In-memory word-prefix index over visited URLs and open tabs.
+
+    Each entry is split into word tokens (host labels, path segments and
+    title words). A sorted token list answers "words starting with X" with
+    a bisect, and postings map tokens to entries. Queries also scan a
+    small list of the most frecent entries, so short inputs still find the
+    pages people actually use. The work per query is capped, which keeps
+    lookups well under a millisecond regardless of history size.
+    """
+
+    TOKEN_PATTERN = re.compile(r"[^\W_]+")
+    STOP_TOKENS = frozenset(("http", "https", "www", "com", "org", "net", "html", "htm",
+                             "php", "aspx", "index"))
+    SCHEME_PATTERN = re.compile(r"^[a-z][a-z0-9+.-]*://(www\.)?")
+    TOP_SIZE = 250
+    MAX_SCANNED = 300
+    MAX_TITLE = 120
+
+    def __init__(self):
+        self.entries = {}
+        self.postings = {}
+        self.tokens = []
+        self.top = []
+        self.hosts = {}
+
+    @classmethod
+    def normalize(cls, text):
+        """Lowercase and drop the scheme, www. and a trailing slash"""
+        return cls.SCHEME_PATTERN.sub("", text.strip().lower()).rstrip("/")
+
+    @classmethod
+    def from_database(cls, conn, limit=500000):
+        """Build an index from the history database (runs on the history worker)"""
+        index = cls()
+        rows = conn.execute("SELECT url, title, visit_count, last_visit FROM urls "
+                            "ORDER BY last_visit DESC LIMIT ?", (limit,))
+        index.load(rows)
+        return index
+
+    def load(self, rows):
+        """Bulk insert (url, title, visit_count, last_visit) rows"""
+        now = time.time()
+        for url, title, visit_count, last_visit in rows:
+            key = self.normalize(url)
+            if (entry := self.entries.get(key)) is None:
+                entry = self.entries[key] = OmniboxEntry(url, key)
+                self.add_host(url)
+            entry.visit_count += visit_count
+            entry.last_visit = max(entry.last_visit, last_visit)
+            entry.score = frecency(entry.visit_count, entry.last_visit, now)
+            self.set_title(entry, title or entry.title, sorted_tokens=False)
+        self.tokens.sort()
+        self.rebuild_top()
+
+    def entry_for(self, url):
+        key = self.normalize(url)
+        if (entry := self.entries.get(key)) is None:
+            entry = self.entries[key] = OmniboxEntry(url, key)
+            self.add_host(url)
+            self.set_title(entry, "")
+        return entry
+
+    def add_host(self, url):
+        # Remembered so typed host names from history resolve as addresses
+        parts = urlsplit(url)
+        if parts.hostname and parts.scheme in ("http", "https"):
+            if self.hosts.get(parts.hostname) != "https":
+                self.hosts[parts.hostname] = parts.scheme
+
+    def index_tokens(self, words):
+        # Numbers and long ids are left to the haystack check; indexing them
+        # would add a posting list per page for no useful prefix matches
+        return {word for word in words if 1 < len(word) <= 24 and not word.isdigit()
+                and word not in self.STOP_TOKENS}
+
+    def set_title(self, entry, title, sorted_tokens=True):
+        entry.title = (title or "")[:self.MAX_TITLE]
+        words = self.TOKEN_PATTERN.findall(f"{entry.key} {entry.title.lower()}")
+        entry.haystack = " " + " ".join(words)
+        tokens = self.index_tokens(words)
+        if not entry.tokens:
+            for token in tokens:
+                if (postings := self.postings.get(token)) is None:
+                    postings = self.postings[token] = []
+                    if sorted_tokens:
+                        bisect.insort(self.tokens, token)
+                    else:
+                        self.tokens.append(token)
+                postings.append(entry)
+            entry.tokens = tuple(tokens)
+            return
+        for token in set(entry.tokens) - tokens:
+            postings = self.postings[token]
+            postings.remove(entry)
+            if not postings:
+                del self.postings[token]
+                if sorted_tokens:
+                    del self.tokens[bisect.bisect_left(self.tokens, token)]
+                else:
+                    self.tokens.remove(token)
+        for token in tokens - set(entry.tokens):
+            if (postings := self.postings.get(token)) is None:
+                postings = self.postings[token] = []
+                if sorted_tokens:
+                    bisect.insort(self.tokens, token)
+                else:
+                    self.tokens.append(token)
+            postings.append(entry)
+        entry.tokens = tuple(tokens)
+
+    def record_visit(self, url, title="", when=None):
+        entry = self.entry_for(url)
+        entry.visit_count += 1
+        entry.last_visit = when or time.time()
+        entry.score = frecency(entry.visit_count, entry.last_visit)
+        if title:
+            self.set_title(entry, title)
+        self.update_top(entry)
+
+    def record_title(self, url, title):
+        if (entry := self.entries.get(self.normalize(url))) is not None and title:
+            self.set_title(entry, title)
+
+    def tab_opened(self, url, title=""):
+        entry = self.entry_for(url)
+        entry.open_count += 1
+        if title and not entry.title:
+            self.set_title(entry, title)
+
+    def tab_closed(self, url):
+        if (entry := self.entries.get(self.normalize(url))) is not None:
+            entry.open_count = max(0, entry.open_count - 1)
+
+    def merge(self, other):
+        """Fold in visits and open tabs recorded in another index"""
+        for entry in other.entries.values():
+            if entry.visit_count:
+                merged = self.entry_for(entry.url)
+                merged.visit_count += entry.visit_count
+                merged.last_visit = max(merged.last_visit, entry.last_visit)
+                merged.score = frecency(merged.visit_count, merged.last_visit)
+                self.update_top(merged)
+            if entry.open_count:
+                self.entry_for(entry.url).open_count += entry.open_count
+            if entry.title:
+                self.set_title(self.entry_for(entry.url), entry.title)
+
+    def rebuild_top(self):
+        for entry in self.top:
+            entry.in_top = False
+        self.top = heapq.nlargest(self.TOP_SIZE, self.entries.values(), key=lambda e: e.score)
+        for entry in self.top:
+            entry.in_top = True
+
+    def update_top(self, entry):
+        # Scores only grow during a session, so the top list can be kept incrementally
+        if not entry.in_top:
+            if len(self.top) >= self.TOP_SIZE and entry.score <= self.top[-1].score:
+                return
+            entry.in_top = True
+            self.top.append(entry)
+        self.top.sort(key=lambda e: e.score, reverse=True)
+        while len(self.top) > self.TOP_SIZE:
+            self.top.pop().in_top = False
+
+    def query(self, text, limit=8):
+        """Best matching entries for the typed text, best first"""
+        query = self.normalize(text)
+        words = self.TOKEN_PATTERN.findall(query)
+        if not words:
+            return []
+        first, *rest = [" " + word for word in words]
+
+        def matching(entries):
+            if rest:
+                return [entry for entry in entries if first in entry.haystack and
+                        all(needle in entry.haystack for needle in rest)]
+            return [entry for entry in entries if first in entry.haystack]
+        
+        candidates = set(matching(self.top))
+        
+        # Walk the postings of the most selective word, verifying the others.
+        # Postings are loaded most recent first, so the scan cap drops the
+        # oldest matches of very common words.
+        if indexed := self.index_tokens(words):
+            word = max(indexed, key=len)
+            budget = self.MAX_SCANNED
+            i = bisect.bisect_left(self.tokens, word)
+            while i < len(self.tokens) and budget > 0:
+                token = self.tokens[i]
+                if not token.startswith(word):
+                    break
+                postings = self.postings[token]
+                candidates.update(matching(itertools.islice(postings, budget)))
+                budget -= len(postings)
+                i += 1
+
+        def rank(entry):
+            score = entry.score or 1
+            if entry.key.startswith(query):
+                score *= 4
+            if entry.open_count:
+                score *= 2
+            return score
+
+        return heapq.nlargest(limit, candidates, key=rank)
+
+
+class SearchSuggestionProvider(QObject):
+    """Search suggestions for URL bar input, fetched from a suggest endpoint.
+
+    The endpoint is a URL template with a {query} placeholder answering
+    in the OpenSearch suggestions format (["query", ["suggestion", ...]]),
+    so a local stand-in server can replace Synax in tests. Requests are
+    debounced, a superseded request is aborted, and successful answers
+    are kept in an LRU cache keyed by the typed prefix, so backspacing
+    and retyping is served without touching the network.
+    """
+
+    DEBOUNCE_MS = 200
+    CACHE_SIZE = 256
+    MAX_SUGGESTIONS = 5
+    MIN_LENGTH = 2
+
+    def __init__(self, network_manager, endpoint, parent=None):
+        super().__init__(parent)
+        self.network_manager = network_manager
+        self.endpoint = endpoint
+        self.cache = OrderedDict()
+        self.reply = None
+        self.pending = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.fetch)
+
+    @staticmethod
+    def cache_key(text):
+        return " ".join(text.lower().split())
+
+    def request(self, text, callback):
+        """Call callback with suggestions for text, now if cached or after the debounce"""
+        key = self.cache_key(text)
+        self.timer.stop()
+        self.abort()
+        if not self.endpoint or len(key) < self.MIN_LENGTH:
+            return
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            callback(self.cache[key])
+            return
+        self.pending = (key, callback)
+        self.timer.start(self.DEBOUNCE_MS)
+
+    def abort(self):
+        self.pending = None
+        if self.reply is not None:
+            reply, self.reply = self.reply, None
+            reply.abort()
+
+    def fetch(self):
+        if self.pending is None:
+            return
+        key, callback = self.pending
+        url = QUrl(self.endpoint.format(query=quote_plus(key)))
+        self.reply = reply = self.network_manager.get(QNetworkRequest(url))
+        reply.finished.connect(lambda: self.fetched(reply, key, callback))
+
+    def fetched(self, reply, key, callback):
+        reply.deleteLater()
+        if reply.error() == QNetworkReply.OperationCanceledError:
+            return
+        if reply is self.reply:
+            self.reply = None
+        suggestions = None if reply.error() else self.parse(bytes(reply.readAll()))
+        # Failures aren't cached, so the next keystroke asks again
+        if suggestions is not None:
+            self.cache[key] = suggestions
+            while len(self.cache) > self.CACHE_SIZE:
+                self.cache.popitem(last=False)
+        if self.pending is not None and self.pending[0] == key:
+            self.pending = None
+            callback(suggestions or [])
+
+    def parse(self, data):
+        """Suggestions from an OpenSearch answer, or None if it is malformed"""
+        try:
+            payload = json.loads(data.decode("utf-8"))
+            suggestions = payload[1]
+            iter(suggestions)
+        except (ValueError, IndexError, KeyError, TypeError):
+            return None
+        return [text for text in suggestions if isinstance(text, str)][:self.MAX_SUGGESTIONS]
+
+
+class FaviconStore(QObject):
+    """Favicons shared by all tabs and kept across restarts.
+
+    Icons are reduced to a 32px PNG and identified by its hash, so a site
+    whose pages all use the same icon holds one QIcon in memory and one
+    row on disk. An icon is only stored once the page has settled: its
+    load finished and the icon has stayed the same for a moment, so
+    placeholders don't stick, and animated icons are stored at most once
+    per interval. A host maps to the icon its pages settled on most
+    often and most recently, which lets a rebrand take over after a few
+    visits without one odd page flipping it; a page is only mapped
+    separately when its icon differs from its host's, so apps sharing an
+    intranet host keep their own icons. PNGs are written to the history
+    database by its worker and read back in one query at startup; they
+    are decoded on first use.
+    """
+
+    ICON_SIZE = 32
+    SETTLE_MS = 2000
+    STORE_INTERVAL = 30
+    VOTE_DECAY = 0.8
+    SWITCH_MARGIN = 2.0
+
+    def __init__(self, history, parent=None):
+        super().__init__(parent)
+        self.history = history
+        self.keys = {}
+        self.votes = {}
+        self.icons = {}
+        self.png_data = {}
+        history.query(self.load_all, self.loaded)
+
+    @staticmethod
+    def load_all(conn):
+        return (conn.execute("SELECT key, hash FROM favicon_keys").fetchall(),
+                conn.execute("SELECT hash, png FROM favicons").fetchall())
+
+    def loaded(self, result):
+        if not result:
+            return
+        keys, icons = result
+        # Icons seen during this session are newer than the stored ones
+        for key, digest in keys:
+            self.keys.setdefault(key, digest)
+        for digest, png in icons:
+            self.png_data.setdefault(digest, png)
+
+    @staticmethod
+    def page_key(url):
+        return url.toString(QUrl.RemoveFragment)
+
+    def icon_for(self, url):
+        """Cached icon for a page (QUrl or string), or a null QIcon"""
+        url = QUrl(url) if isinstance(url, str) else url
+        digest = self.keys.get(self.page_key(url)) or self.keys.get(url.host())
+        if digest is None:
+            return QIcon()
+        if (icon := self.icons.get(digest)) is None:
+            pixmap = QPixmap()
+            pixmap.loadFromData(self.png_data.pop(digest, b""), "PNG")
+            icon = self.icons[digest] = QIcon(pixmap)
+        return icon
+
+    def watch(self, tab):
+        tab.favicon_loading = False
+        tab.favicon_waiting_since = None
+        tab.favicon_timer = QTimer(tab)
+        tab.favicon_timer.setSingleShot(True)
+        tab.favicon_timer.timeout.connect(lambda: self.settled(tab))
+        tab.page.loadStarted.connect(lambda: setattr(tab, "favicon_loading", True))
+        tab.page.loadFinished.connect(lambda ok: self.load_finished(tab))
+        tab.browser.iconChanged.connect(lambda icon: self.icon_changed(tab))
+
+    def load_finished(self, tab):
+        tab.favicon_loading = False
+        tab.favicon_timer.start(self.SETTLE_MS)
+
+    def icon_changed(self, tab):
+        now = time.monotonic()
+        if tab.favicon_waiting_since is None:
+            tab.favicon_waiting_since = now
+        # An icon that never stops changing is stored once per interval anyway
+        if now - tab.favicon_waiting_since >= self.STORE_INTERVAL:
+            tab.favicon_timer.stop()
+            self.settled(tab)
+        else:
+            tab.favicon_timer.start(self.SETTLE_MS)
+
+    def settled(self, tab):
+        if tab.favicon_loading and tab.favicon_waiting_since is not None \
+                and time.monotonic() - tab.favicon_waiting_since < self.STORE_INTERVAL:
+            return
+        tab.favicon_waiting_since = None
+        url, icon = tab.browser.url(), tab.browser.icon()
+        if not icon.isNull() and url.host() and url.scheme() in ("http", "https"):
+            self.store(url, icon)
+
+    @classmethod
+    def remap(cls, keys, votes, host, page, digest):
+        """Count a settled icon for the page and its host; returns the (changed, removed) keys.
+
+        votes maps each host to recency-weighted counts of its pages' icons.
+        The host key only moves to another icon once that icon clearly
+        outweighs the current one.
+        """
+        weights = votes.setdefault(host, {})
+        if not weights and host in keys:
+            weights[keys[host]] = 1.0
+        for other in list(weights):
+            weights[other] *= cls.VOTE_DECAY
+            if weights[other] < 0.05:
+                del weights[other]
+        weights[digest] = weights.get(digest, 0.0) + 1.0
+        
+        changed, removed = [], []
+        current = keys.get(host)
+        if current is None or (current != digest and
+                               weights[digest] > cls.SWITCH_MARGIN * weights.get(current, 0.0)):
+            keys[host] = digest
+            changed.append(host)
+        if keys[host] == digest:
+            # A page showing its host's icon needs no key of its own
+            if page in keys:
+                del keys[page]
+                removed.append(page)
+        elif keys.get(page) != digest:
+            keys[page] = digest
+            changed.append(page)
+        return changed, removed
+
+    def store(self, url, icon):
+        pixmap = icon.pixmap(self.ICON_SIZE, self.ICON_SIZE)
+        buffer = QBuffer()
+        buffer.open(QIODevice.WriteOnly)
+        pixmap.save(buffer, "PNG")
+        png = bytes(buffer.data())
+        digest = hashlib.sha1(png).hexdigest()
+        
+        keys, stale_keys = self.remap(self.keys, self.votes, url.host(), self.page_key(url), digest)
+        if not keys and not stale_keys:
+            return
+        if digest not in self.icons and digest not in self.png_data:
+            self.icons[digest] = QIcon(pixmap)
+        self.history.save_favicon(digest, png, keys, stale_keys)
+
+
+class UrlBarCompleter(QObject):
+    """Suggestion popup for the URL bar.
+
+    Suggestions are grouped in sections (history and open tabs first) that
+    are merged into one list; other providers can fill in their own
+    section with set_section() whenever their results arrive.
+    """
+
+    UrlRole = Qt.UserRole + 1
+    OpenTabRole = Qt.UserRole + 2
+    SECTIONS = ("history", "content", "search")
+    MAX_ROWS = 12
+    CONTENT_SEARCH_DELAY_MS = 150
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        self.sections = {}
+        self.text = ""
+        self.top_entries = []
+        self.suppress_return = False
+        
+        self.model = QStandardItemModel(self)
+        self.completer = QCompleter(self.model, self)
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.completer.setCompletionRole(self.UrlRole)
+        self.completer.setMaxVisibleItems(self.MAX_ROWS)
+        self.completer.activated[QModelIndex].connect(self.activate)
+        window.url_bar.setCompleter(self.completer)
+        window.url_bar.textEdited.connect(self.update)
+        
+        # Page text is searched on the history worker once typing pauses
+        self.content_timer = QTimer(self)
+        self.content_timer.setSingleShot(True)
+        self.content_timer.timeout.connect(self.search_content)
+        
+
+    @property
+    def index(self):
+        # One index serves the URL bars of all windows
+        return self.window.context.omnibox
+
+    def update(self, text):
+        """Refresh suggestions for the text typed so far"""
+        self.text = text
+        self.sections.clear()
+        entries = self.index.query(text) if text.strip() else []
+        self.top_entries = entries
+        self.set_section("history", [(entry.url, entry.title, entry.open_count > 0)
+                                     for entry in entries])
+        if len(text.strip()) >= 3:
+            self.content_timer.start(self.CONTENT_SEARCH_DELAY_MS)
+        # Addresses are not sent to the search backend
+        url = url_resolver.resolve(text)
+        if url and url.startswith(SEARCH_URL):
+            self.window.search_suggestions.request(
+                text, lambda suggestions: self.suggestions_found(text, suggestions))
+        else:
+            self.window.search_suggestions.abort()
+
+    def suggestions_found(self, text, suggestions):
+        if text == self.text:
+            self.set_section("search", [(suggestion, suggestion, False, f"\U0001F50D {suggestion}")
+                                        for suggestion in suggestions])
+
+    def search_content(self):
+        text = self.text
+        self.window.history.search_text(text, lambda rows: self.content_found(text, rows), limit=4)
+
+    def content_found(self, text, rows):
+        # Results for text the user has since changed are stale
+        if text != self.text or not rows:
+            return
+        self.set_section("content", [(url, f"{title or url}: {snippet}", False)
+                                     for url, title, snippet, _indexed_at in rows])
+
+    def set_section(self, name, rows):
+        """Replace one section's rows and redraw.
+
+        Rows are (url, title, is_open_tab) with an optional display label;
+        url may also be plain text, which is resolved when activated.
+        """
+        self.sections[name] = rows
+        self.model.clear()
+        seen = set()
+        for section in self.SECTIONS:
+            for url, title, is_open_tab, *label in self.sections.get(section, ()):
+                if url in seen or self.model.rowCount() >= self.MAX_ROWS:
+                    continue
+                seen.add(url)
+                label = label[0] if label else (f"{title} \u2014 {url}" if title else url)
+                item = QStandardItem(f"Switch to tab: {label}" if is_open_tab else label)
+                item.setIcon(self.window.favicons.icon_for(url))
+                item.setData(url, self.UrlRole)
+                item.setData(is_open_tab, self.OpenTabRole)
+                self.model.appendRow(item)
+        if self.model.rowCount() and self.window.url_bar.hasFocus():
+            self.completer.complete()
+        else:
+            self.completer.popup().hide()
+
+    def activate(self, index):
+        # The line edit also sees the Return key that picked the suggestion
+        self.suppress_return = True
+        QTimer.singleShot(0, self.clear_suppress_return)
+        url = index.data(self.UrlRole)
+        if index.data(self.OpenTabRole) and self.window.switch_to_url(url):
+            return
+        self.window.url_bar.setText(url)
+        self.window.navigate_current_tab(url)
+
+    def clear_suppress_return(self):
+        self.suppress_return = False
+
+
+class HistoryPanel(QDialog):
+    """Browsable history with full-text search over visited pages"""
+
+    UrlRole = Qt.UserRole + 1
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        self.setWindowTitle("History")
+        self.setMinimumSize(700, 500)
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(5, 5, 5, 5)
+        
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("Search history and page text")
+        self.search_box.setClearButtonEnabled(True)
+        self.search_box.textChanged.connect(lambda: self.search_timer.start(200))
+        layout.addWidget(self.search_box)
+        
+        self.results = QListWidget()
+        self.results.setWordWrap(True)
+        self.results.itemActivated.connect(self.open_item)
+        layout.addWidget(self.results)
+        
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.timeout.connect(self.search)
+        self.search()
+
+    def search(self):
+        text = self.search_box.text().strip()
+        if text:
+            self.window.history.search_text(text, lambda rows: self.show_results(text, rows))
+        else:
+            self.window.history.recent_visits(lambda rows: self.show_results(text, rows))
+
+    def show_results(self, text, rows):
+        if text != self.search_box.text().strip() or rows is None:
+            return
+        self.results.clear()
+        for url, title, *detail in rows:
+            when = datetime.fromtimestamp(detail[-1]).strftime("%Y-%m-%d %H:%M")
+            lines = [title or url, url]
+            if len(detail) == 2:
+                lines.append(detail[0])
+            item = QListWidgetItem(self.window.favicons.icon_for(url), f"{when}  " + "\n".join(lines))
+            item.setData(self.UrlRole, url)
+            self.results.addItem(item)
+
+    def open_item(self, item):
+        self.window.add_new_tab(item.data(self.UrlRole))
+
+
+def url_origin(url):
+    """scheme://host[:port] of a URL string, or None for non-network URLs"""
+    qurl = QUrl(url)
+    if qurl.scheme() not in ("http", "https") or not qurl.host():
+        return None
+    return qurl.adjusted(QUrl.RemovePath | QUrl.RemoveQuery | QUrl.RemoveFragment |
+                         QUrl.RemoveUserInfo).toString()
+
+
+class Preconnector(QObject):
+    """Warms up the likely destination while the user is still typing.
+
+    Once the URL bar input has been stable for a moment, the top
+    suggestion (or the typed address) is resolved through the system
+    resolver and a preconnect hint is placed in a hidden blank page on
+    the current tab's profile, which opens the connection in that
+    profile's network stack so the navigation reuses it. The hint never
+    touches the open page, which could otherwise read what is being
+    typed from its DOM. Each origin is warmed at most once per interval,
+    and predictions are scored as hits or misses against the URL
+    actually loaded.
+    """
+
+    STABLE_MS = 250
+    ORIGIN_INTERVAL = 30
+    PREDICTION_TTL = 60
+    HINT_PAGE_IDLE_MS = 15000
+    HINT_SCRIPT = """(function(origin) {
+        for (const rel of ["dns-prefetch", "preconnect"]) {
+            const link = document.createElement("link");
+            link.rel = rel;
+            link.href = origin;
+            (document.head || document.documentElement).appendChild(link);
+            setTimeout(() => link.remove(), 10000);
+        }
+    })(%s)"""
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        self.warmed = {}
+        self.hint_pages = {}
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.warm_up)
+        window.url_bar.textEdited.connect(lambda: self.timer.start(self.STABLE_MS))
+        # Hint pages only live while the user is typing
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.timeout.connect(self.drop_hint_pages)
+
+    def predicted_url(self):
+        if entries := self.window.url_completer.top_entries:
+            return entries[0].url
+        url = url_resolver.resolve(self.window.url_bar.text())
+        return None if not url or url.startswith(SEARCH_URL) else url
+
+    def warm_up(self):
+        url = self.predicted_url()
+        origin = url and url_origin(url)
+        tab = self.window.tabs.currentWidget()
+        if not origin or not tab:
+            return
+        now = time.monotonic()
+        if now - self.warmed.get(origin, -self.ORIGIN_INTERVAL) < self.ORIGIN_INTERVAL:
+            return
+        self.warmed[origin] = now
+        # Forget old origins so the table stays small
+        for stale in [o for o, t in self.warmed.items() if now - t > self.PREDICTION_TTL]:
+            del self.warmed[stale]
+        metrics.inc("nexium_preconnects_issued_total")
+        QHostInfo.lookupHost(QUrl(origin).host(), lambda info: None)
+        page = self.hint_page(tab.container)
+        if page.ready:
+            self.send_hint(page, origin)
+        else:
+            page.pending.append(origin)
+        self.idle_timer.start(self.HINT_PAGE_IDLE_MS)
+
+    def hint_page(self, container):
+        """Hidden blank page on the profile the next navigation will use"""
+        if (page := self.hint_pages.get(container)) is None:
+            context = self.window.context
+            # Holding the container keeps its profile alive as long as the page
+            profile = context.containers.acquire(container) if container else context.profile
+            page = self.hint_pages[container] = QWebEnginePage(profile, self)
+            page.setAudioMuted(True)
+            page.ready = False
+            page.pending = []
+            page.loadFinished.connect(lambda ok, page=page: self.hint_page_loaded(page))
+            page.setUrl(QUrl("about:blank"))
+        return page
+
+    def hint_page_loaded(self, page):
+        page.ready = True
+        for origin in page.pending:
+            self.send_hint(page, origin)
+        page.pending = []
+
+    def send_hint(self, page, origin):
+        page.runJavaScript(self.HINT_SCRIPT % json.dumps(origin), QWebEngineScript.ApplicationWorld)
+
+    def drop_hint_pages(self):
+        for container, page in self.hint_pages.items():
+            page.deleteLater()
+            if container:
+                self.window.context.containers.release(container)
+        self.hint_pages = {}
+
+    def navigation_started(self, url):
+        """Score the predictions against the origin actually being loaded"""
+        self.timer.stop()
+        origin = url_origin(url)
+        if not origin or not self.warmed:
+            return
+        warmed_at = self.warmed.get(origin)
+        hit = warmed_at is not None and time.monotonic() - warmed_at < self.PREDICTION_TTL
+        metrics.inc("nexium_preconnect_predictions_total", result="hit" if hit else "miss")
+
+
+class LinkPrefetcher(QObject):
+    """Prefetches same-origin links the pointer rests on.
+
+    After a short hover dwell the link target is fetched into the HTTP
+    cache with a <link rel=prefetch> hint placed in the page, so a
+    following click is served locally. Each document gets a small
+    prefetch budget, and a global cap limits how many prefetches may be
+    in flight; since the page doesn't report completion, a prefetch
+    holds its slot for a fixed time.
+    """
+
+    DWELL_MS = 150
+    PER_TAB_BUDGET = 10
+    MAX_IN_FLIGHT = 4
+    SLOT_SECONDS = 3
+    PREFETCH_SCRIPT = """(function(url) {
+        const link = document.createElement("link");
+        link.rel = "prefetch";
+        link.href = url;
+        link.onload = link.onerror = () => link.remove();
+        (document.head || document.documentElement).appendChild(link);
+    })(%s)"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.in_flight = deque()
+        self.hovered = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.dwell_elapsed)
+
+    def watch(self, tab):
+        tab.prefetched = set()
+        tab.prefetch_budget = self.PER_TAB_BUDGET
+        tab.page.linkHovered.connect(lambda url: self.link_hovered(tab, url))
+        tab.browser.urlChanged.connect(lambda url: self.url_changed(tab, url))
+
+    def link_hovered(self, tab, url):
+        self.timer.stop()
+        self.hovered = (tab, url) if url else None
+        if url:
+            self.timer.start(self.DWELL_MS)
+
+    def dwell_elapsed(self):
+        if self.hovered is None:
+            return
+        tab, url = self.hovered
+        target = QUrl(url)
+        current = tab.page.url()
+        origin = url_origin(url)
+        if (not origin or origin != url_origin(current.toString()) or
+                target.adjusted(QUrl.RemoveFragment) == current.adjusted(QUrl.RemoveFragment)):
+            return
+        key = target.toString(QUrl.RemoveFragment)
+        if key in tab.prefetched or tab.prefetch_budget <= 0:
+            return
+        
+        now = time.monotonic()
+        while self.in_flight and now - self.in_flight[0] > self.SLOT_SECONDS:
+            self.in_flight.popleft()
+        if len(self.in_flight) >= self.MAX_IN_FLIGHT:
+            return
+        self.in_flight.append(now)
+        tab.prefetch_budget -= 1
+        tab.prefetched.add(key)
+        metrics.inc("nexium_link_prefetches_total")
+        tab.page.runJavaScript(self.PREFETCH_SCRIPT % json.dumps(key),
+                               QWebEngineScript.ApplicationWorld)
+
+    def url_changed(self, tab, url):
+        # Score the outgoing document's prefetches, then start a fresh budget
+        if tab.prefetched:
+            hit = url.toString(QUrl.RemoveFragment) in tab.prefetched
+            metrics.inc("nexium_link_prefetch_navigations_total", result="hit" if hit else "miss")
+        tab.prefetched = set()
+        tab.prefetch_budget = self.PER_TAB_BUDGET
+
+
+class CacheWarmer(QObject):
+    """Warms the HTTP cache with the most frecent sites while the user is idle.
+
+    Well after startup, and only when there has been no input for a
+    while, the top history destinations that aren't already open are
+    loaded one at a time in a hidden page on the default profile, filling
+    its disk cache. The bytes each load transferred are read from the
+    page's resource timing and the next load waits long enough to keep
+    the average under the bandwidth cap. Any user input stops the
+    current load and postpones the rest.
+
+    The page runs scripts with the user's cookies, so only landing pages
+    are replayed: URLs with a query string or an action-like path
+    (logout, delete, ...) are never warmed.
+    """
+
+    STARTUP_DELAY_MS = 120000
+    RETRY_MS = 30000
+    SETTLE_MS = 3000
+    LOAD_TIMEOUT_MS = 30000
+    MIN_GAP_MS = 5000
+    REWARM_INTERVAL = 6 * 3600
+    INPUT_EVENTS = frozenset((QEvent.KeyPress, QEvent.MouseButtonPress, QEvent.MouseMove,
+                              QEvent.Wheel, QEvent.TouchBegin))
+    ACTION_PATTERN = re.compile(
+        r"(^|[/_.-])(log-?out|sign-?out|log-?off|delete|remove|unsubscribe|confirm|"
+        r"approve|reject|cancel|action|submit|checkout|pay|reset|revoke|disable)([/_.-]|$)",
+        re.IGNORECASE)
+    BYTES_SCRIPT = """performance.getEntriesByType("navigation")
+        .concat(performance.getEntriesByType("resource"))
+        .reduce((total, entry) => total + (entry.transferSize || 0), 0)"""
+
+    def __init__(self, context):
+        super().__init__(context)
+        self.context = context
+        self.count = env_number("NEXIUM_WARMUP_COUNT", 12)
+        self.idle_seconds = env_number("NEXIUM_WARMUP_IDLE_SECONDS", 60)
+        self.rate = env_number("NEXIUM_WARMUP_KBPS", 512) * 1024
+        self.byte_budget = env_number("NEXIUM_WARMUP_MAX_MB", 200) * 1048576
+        self.last_input = time.monotonic()
+        self.warmed = {}
+        self.queue = []
+        self.page = None
+        self.loading = None
+        
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.next)
+        self.load_timer = QTimer(self)
+        self.load_timer.setSingleShot(True)
+        self.load_timer.timeout.connect(self.load_timed_out)
+        QApplication.instance().installEventFilter(self)
+        if self.count > 0 and self.byte_budget > 0:
+            self.timer.start(self.STARTUP_DELAY_MS)
+
+    def eventFilter(self, obj, event):
+        if event.type() in self.INPUT_EVENTS:
+            self.last_input = time.monotonic()
+            if self.loading is not None:
+                self.stop_loading()
+                self.timer.start(self.RETRY_MS)
+        return False
+
+    def idle(self):
+        return time.monotonic() - self.last_input >= self.idle_seconds
+
+    def next(self):
+        if self.byte_budget <= 0:
+            return
+        if not self.idle():
+            self.timer.start(self.RETRY_MS)
+            return
+        if not self.queue:
+            self.context.history.query(self.top_destinations, self.destinations_found)
+            return
+        url = self.queue.pop(0)
+        if self.page is None:
+            self.page = QWebEnginePage(self.context.profile, self)
+            self.page.setAudioMuted(True)
+            self.page.loadFinished.connect(self.load_finished)
+        self.loading = url
+        self.warmed[url] = time.time()
+        self.load_timer.start(self.LOAD_TIMEOUT_MS)
+        self.page.setUrl(QUrl(url))
+
+    def top_destinations(self, conn):
+        """Most frecent URLs of the last month (runs on the history worker)"""
+        now = time.time()
+        # Only visits made in the default profile count: warming a page seen
+        # only inside a container would leak it into the default profile
+        rows = conn.execute("""
+            SELECT u.url, COUNT(*), MAX(v.visit_time) FROM visits v JOIN urls u ON u.id = v.url_id
+            WHERE v.visit_time > ? AND v.container = ''
+            GROUP BY u.id ORDER BY COUNT(*) DESC LIMIT ?
+        """, (now - 31 * 86400, self.count * 4)).fetchall()
+        rows.sort(key=lambda row: frecency(row[1], row[2], now), reverse=True)
+        return [url for url, _, _ in rows if self.is_landing_page(url)]
+
+    @classmethod
+    def is_landing_page(cls, url):
+        """True for plain http(s) pages that are safe to load unattended"""
+        parts = urlsplit(url)
+        return parts.scheme in ("http", "https") and not parts.query \
+            and not cls.ACTION_PATTERN.search(parts.path)
+
+    def destinations_found(self, urls):
+        now = time.time()
+        open_urls = {tab.browser.url().toString() for tab in self.context.all_tabs()}
+        self.queue = [url for url in (urls or [])[:self.count] if url not in open_urls and
+                      now - self.warmed.get(url, 0) > self.REWARM_INTERVAL]
+        # Nothing left to warm: look again once the re-warm interval has passed
+        self.timer.start(self.MIN_GAP_MS if self.queue else self.REWARM_INTERVAL * 1000)
+
+    def load_finished(self, ok):
+        if self.loading is None:
+            return
+        # Give late subresources a moment before measuring the transfer
+        QTimer.singleShot(self.SETTLE_MS, lambda url=self.loading: self.measure(url))
+
+    def measure(self, url):
+        if self.loading != url:
+            return
+        self.page.runJavaScript(self.BYTES_SCRIPT, lambda total: self.measured(url, total))
+
+    def measured(self, url, total):
+        if self.loading != url:
+            return
+        transferred = int(total or 0)
+        self.byte_budget -= transferred
+        metrics.inc("nexium_cache_warmups_total")
+        metrics.inc("nexium_cache_warmup_bytes_total", transferred)
+        self.stop_loading()
+        # Spread loads out so the average stays under the bandwidth cap
+        self.timer.start(max(self.MIN_GAP_MS, int(transferred / self.rate * 1000)))
+
+    def load_timed_out(self):
+        if self.loading is not None:
+            self.stop_loading()
+            self.timer.start(self.MIN_GAP_MS)
+
+    def stop_loading(self):
+        self.loading = None
+        self.load_timer.stop()
+        self.page.triggerAction(QWebEnginePage.Stop)
+        self.page.setUrl(QUrl("about:blank"))
+
+
+class Prerenderer(QObject):
+    """Loads a high-confidence URL bar suggestion in a hidden tab.
+
+    When the top suggestion is a frequently visited page that the typed
+    text is a prefix of, and it clearly outranks the other suggestions,
+    it is loaded off-screen. If the user then navigates there, the
+    finished tab is swapped in instead of loading again. The swapped-in
+    tab starts with an empty back history, so this is only done when the
+    current tab is fresh (showing the home page, with no history). Only one
+    prerender runs at a time; none starts while the renderers are
+    already using a lot of memory, and a prerender is dropped when the
+    input moves elsewhere, when it outgrows its memory allowance or when
+    it goes unused for a minute.
+    """
+
+    STABLE_MS = 400
+    MIN_VISITS = 5
+    TTL = 60
+    CHECK_INTERVAL_MS = 2000
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        self.confidence_threshold = env_number("NEXIUM_PRERENDER_CONFIDENCE", 0.6)
+        self.max_memory = env_number("NEXIUM_PRERENDER_MAX_MB", 512) * 1048576
+        self.max_total_memory = env_number("NEXIUM_PRERENDER_MAX_TOTAL_MB", 3072) * 1048576
+        self.tab = None
+        self.url = None
+        self.started = 0.0
+        
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.start)
+        self.check_timer = QTimer(self)
+        self.check_timer.timeout.connect(self.check)
+        # Connected after the completer, so its suggestions are already current
+        window.url_bar.textEdited.connect(self.input_changed)
+
+    def candidate(self):
+        """URL of the top suggestion if it is confident enough to prerender"""
+        entries = self.window.url_completer.top_entries
+        typed = OmniboxIndex.normalize(self.window.url_bar.text())
+        if not entries or len(typed) < 2:
+            return None
+        top = entries[0]
+        if top.visit_count < self.MIN_VISITS or top.open_count or not top.key.startswith(typed):
+            return None
+        total = sum(entry.score for entry in entries)
+        if not total or top.score / total < self.confidence_threshold:
+            return None
+        return top.url
+
+    def input_changed(self):
+        if self.tab is not None and not self.matches(self.candidate()):
+            self.cancel("input changed")
+        self.timer.start(self.STABLE_MS)
+
+    def matches(self, url):
+        if not url or self.tab is None:
+            return False
+        key = OmniboxIndex.normalize(url)
+        return key in (OmniboxIndex.normalize(self.url),
+                       OmniboxIndex.normalize(self.tab.browser.url().toString()))
+
+    def start(self):
+        url = self.candidate()
+        current = self.window.tabs.currentWidget()
+        if not url or self.tab is not None or current is None or current.container \
+                or not self.window.is_fresh_tab(current):
+            return
+        renderer_memory = sum(filter(None, (process_memory(pid) for pid in metrics.renderer_pids)))
+        if renderer_memory > self.max_total_memory:
+            return
+        self.tab = self.window.create_tab()
+        self.tab.page.setAudioMuted(True)
+        self.url = url
+        self.started = time.monotonic()
+        self.tab.browser.setUrl(QUrl(url))
+        self.check_timer.start(self.CHECK_INTERVAL_MS)
+        metrics.inc("nexium_prerenders_total", result="started")
+        flight_recorder.record("prerender", self.tab.tab_id, url)
+
+    def check(self):
+        if self.tab is None:
+            self.check_timer.stop()
+        elif time.monotonic() - self.started > self.TTL:
+            self.cancel("expired")
+        elif (process_memory(self.tab.page.renderProcessPid()) or 0) > self.max_memory:
+            self.cancel("memory")
+
+    def take(self, url):
+        """Hand over the prerendered tab if it shows url, else None"""
+        if not self.matches(url):
+            return None
+        tab, self.tab = self.tab, None
+        self.check_timer.stop()
+        tab.page.setAudioMuted(False)
+        metrics.inc("nexium_prerenders_total", result="used")
+        return tab
+
+    def cancel(self, reason):
+        tab, self.tab = self.tab, None
+        self.check_timer.stop()
+        if tab is not None:
+            metrics.inc("nexium_prerenders_total", result=reason.replace(" ", "_"))
+            tab.deleteLater()
+
+
+class TabUpdateCoalescer(QObject):
+    """Applies tab title, icon and URL changes at most once per frame.
+
+    Pages that animate document.title or cycle their favicon emit change
+    signals far faster than the screen refreshes, and each setTabText or
+    setWindowTitle relayouts the tab bar or goes out to the window
+    manager. Changes are collected per tab and only the latest value of
+    each is applied when the frame timer fires. The window title and URL
+    bar only ever follow the current tab.
+    """
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        self.pending = {}
+        self.signals_seen = 0
+        self.updates_applied = 0
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(int(env_number("NEXIUM_UI_FRAME_MS", 16)))
+        self.timer.timeout.connect(self.flush)
+
+    @staticmethod
+    def watch(tab):
+        # Changes go to whichever window the tab is in at the time
+        browser = tab.browser
+        browser.titleChanged.connect(
+            lambda title: tab.page.browser_window.tab_updates.mark(tab, "title", title))
+        browser.iconChanged.connect(
+            lambda icon: tab.page.browser_window.tab_updates.mark(tab, "icon", icon))
+        browser.urlChanged.connect(
+            lambda url: tab.page.browser_window.tab_updates.mark(tab, "url", url))
+
+    def refresh(self, tab):
+        """Show what an attached tab already has (e.g. a prerender) right away"""
+        browser = tab.browser
+        if title := browser.title():
+            self.mark(tab, "title", title)
+        if not browser.url().isEmpty():
+            self.mark(tab, "url", browser.url())
+        self.mark(tab, "icon", browser.icon())
+        self.flush()
+
+    def mark(self, tab, field, value):
+        self.signals_seen += 1
+        self.pending.setdefault(tab, {})[field] = value
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def discard(self, tab):
+        self.pending.pop(tab, None)
+
+    def flush(self):
+        self.timer.stop()
+        pending, self.pending = self.pending, {}
+        tabs = self.window.tabs
+        current = tabs.currentWidget()
+        for tab, changes in pending.items():
+            # Tabs move around, so look the index up on every flush
+            if (index := tabs.indexOf(tab)) < 0:
+                continue
+            if (title := changes.get("title")) is not None:
+                tabs.setTabText(index, title[:20] + "..." if len(title) > 20 else title)
+                if tab is current:
+                    self.window.setWindowTitle(f"Nexium - {title}")
+            if "url" in changes and tab.browser.icon().isNull():
+                changes.setdefault("icon", QIcon())
+            if (icon := changes.get("icon")) is not None:
+                if icon.isNull():
+                    # Show the stored icon until the page delivers its own
+                    icon = self.window.favicons.icon_for(tab.effective_url())
+                tabs.setTabIcon(index, icon)
+            url = changes.get("url")
+            if tab is current and url is not None and url.toString() != "about:blank":
+                self.window.url_bar.setText(url.toString())
+            self.window.tab_panel.tab_changed(tab, title, url, icon)
+            if title is not None or url is not None:
+                url_text = tab.effective_url().toString()
+                self.window.tab_index.update(tab, tab.browser.title() or url_text, url_text)
+            self.updates_applied += len(changes)
+
+
+class ThumbnailCache(QObject):
+    """Small JPEG thumbnails of tabs for the overview grid.
+
+    Only the tab on screen is grabbed: shortly after it finishes
+    loading, every half minute while its window is showing, and when a
+    tab bar click is about to switch away from it. A hidden view would
+    have to repaint to be grabbed, so background tabs never are. The
+    grab goes to a worker thread that scales and compresses it. JPEG
+    bytes are kept in memory up to a byte budget; the least recently
+    used ones spill to disk and are read back on demand.
+    """
+
+    ready = pyqtSignal(int, bytes)
+
+    WIDTH = 320
+    HEIGHT = 200
+    QUALITY = 70
+    SETTLE_MS = 1000
+    REFRESH_MS = 30000
+
+    def __init__(self, context):
+        super().__init__(context)
+        self.context = context
+        self.budget = env_number("NEXIUM_THUMBNAIL_CACHE_MB", 8) * 1048576
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.spilled = set()
+        self.live = set()
+        
+        # Tab ids restart with every session, so old spill files are useless
+        self.spill_dir = os.path.join(context.storage_path, "thumbnails")
+        os.makedirs(self.spill_dir, exist_ok=True)
+        for name in os.listdir(self.spill_dir):
+            os.remove(os.path.join(self.spill_dir, name))
+        
+        self.queue = queue.Queue()
+        self.ready.connect(self.store)
+        self.worker = threading.Thread(target=self.run, name="thumbnailer", daemon=True)
+        self.worker.start()
+        
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(self.REFRESH_MS)
+
+    def watch(self, tab):
+        tab.page.loadFinished.connect(
+            lambda ok: QTimer.singleShot(self.SETTLE_MS, lambda: self.capture(tab)))
+
+    def tab_clicked(self, window, index):
+        """Capture the current tab before a click on another one hides it"""
+        if index != window.tabs.currentIndex() and (tab := window.tabs.currentWidget()):
+            self.capture(tab)
+
+    def refresh(self):
+        for window in self.context.windows:
+            if tab := window.tabs.currentWidget():
+                self.capture(tab)
+
+    def capture(self, tab):
+        """Grab the tab if it is on screen; hidden tabs are left alone"""
+        if sip.isdeleted(tab) or not tab.isVisible() or tab.window().isMinimized():
+            return
+        # A tab still behind its session snapshot has nothing new to show
+        if tab.page.lifecycleState() != QWebEnginePage.LifecycleState.Active \
+                or getattr(tab, "placeholder", None) is not None:
+            return
+        image = tab.browser.grab().toImage()
+        if not image.isNull():
+            self.live.add(tab.tab_id)
+            self.queue.put((tab.tab_id, image))
+
+    def run(self):
+        while (job := self.queue.get()) is not None:
+            tab_id, image = job
+            image = image.scaled(self.WIDTH, self.HEIGHT, Qt.KeepAspectRatio,
+                                 Qt.SmoothTransformation)
+            buffer = QBuffer()
+            buffer.open(QIODevice.WriteOnly)
+            image.save(buffer, "JPEG", self.QUALITY)
+            self.ready.emit(tab_id, bytes(buffer.data()))
+
+    def spill_path(self, tab_id):
+        return os.path.join(self.spill_dir, f"{tab_id}.jpg")
+
+    def store(self, tab_id, data):
+        if tab_id not in self.live:
+            return
+        self.drop(tab_id)
+        self.memory[tab_id] = data
+        self.memory_bytes += len(data)
+        while self.memory_bytes > self.budget and len(self.memory) > 1:
+            old_id, old_data = self.memory.popitem(last=False)
+            self.memory_bytes -= len(old_data)
+            try:
+                with open(self.spill_path(old_id), "wb") as f:
+                    f.write(old_data)
+                self.spilled.add(old_id)
+            except OSError as e:
+                print("Thumbnail spill failed:", e)
+
+    def load(self, tab_id):
+        """JPEG bytes of a tab's thumbnail, or None if it was never captured"""
+        if tab_id in self.memory:
+            self.memory.move_to_end(tab_id)
+            return self.memory[tab_id]
+        if tab_id in self.spilled:
+            try:
+                with open(self.spill_path(tab_id), "rb") as f:
+                    return f.read()
+            except OSError:
+                self.spilled.discard(tab_id)
+        return None
+
+    def pixmap(self, tab):
+        pixmap = QPixmap()
+        if data := self.load(tab.tab_id):
+            pixmap.loadFromData(data, "JPEG")
+        return pixmap
+
+    def drop(self, tab_id):
+        if (data := self.memory.pop(tab_id, None)) is not None:
+            self.memory_bytes -= len(data)
+        if tab_id in self.spilled:
+            self.spilled.discard(tab_id)
+            try:
+                os.remove(self.spill_path(tab_id))
+            except OSError:
+                pass
+
+    def forget(self, tab):
+        """Drop a closed tab's thumbnail"""
+        self.live.discard(tab.tab_id)
+        self.drop(tab.tab_id)
+
+    def close(self):
+        self.queue.put(None)
+        self.worker.join(2)
+
+
+class TabOverview(QDialog):
+    """Grid of tab thumbnails; activating one switches to that tab"""
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        self.setWindowTitle("Tab Overview")
+        self.setMinimumSize(900, 600)
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(5, 5, 5, 5)
+        
+        thumbnails = window.thumbnails
+        self.grid = QListWidget()
+        self.grid.setViewMode(QListWidget.IconMode)
+        self.grid.setResizeMode(QListWidget.Adjust)
+        self.grid.setMovement(QListWidget.Static)
+        self.grid.setUniformItemSizes(True)
+        self.grid.setIconSize(QSize(thumbnails.WIDTH, thumbnails.HEIGHT))
+        self.grid.setGridSize(QSize(thumbnails.WIDTH + 20, thumbnails.HEIGHT + 40))
+        self.grid.itemActivated.connect(self.open_item)
+        layout.addWidget(self.grid)
+        
+        self.items = {}
+        for i in range(window.tabs.count()):
+            tab = window.tabs.widget(i)
+            title = tab.browser.title() or tab.browser.url().toString()
+            item = QListWidgetItem(self.icon_for(tab), title[:40])
+            item.setToolTip(title)
+            item.setData(Qt.UserRole, tab.tab_id)
+            self.grid.addItem(item)
+            self.items[tab.tab_id] = (item, tab)
+        self.grid.setCurrentRow(window.tabs.currentIndex())
+        
+        # The visible tab may have changed since it was last captured
+        thumbnails.ready.connect(self.thumbnail_ready)
+        if current := window.tabs.currentWidget():
+            thumbnails.capture(current)
+
+    def icon_for(self, tab):
+        pixmap = self.window.thumbnails.pixmap(tab)
+        return QIcon(pixmap) if not pixmap.isNull() else self.window.favicons.icon_for(tab.browser.url())
+
+    def thumbnail_ready(self, tab_id, data):
+        if tab_id in self.items:
+            item, tab = self.items[tab_id]
+            item.setIcon(self.icon_for(tab))
+
+    def open_item(self, item):
+        _, tab = self.items[item.data(Qt.UserRole)]
+        if (index := self.window.tabs.indexOf(tab)) >= 0:
+            self.window.tabs.setCurrentIndex(index)
+        self.close()
+
+    def closeEvent(self, event):
+        self.window.thumbnails.ready.disconnect(self.thumbnail_ready)
+        super().closeEvent(event)
+
+
+class TabRecord:
+    """What the vertical tab list knows about one tab"""
+
+    __slots__ = ("key", "title", "url", "group", "icon")
+
+    def __init__(self, key, title, url, icon):
+        self.key = key
+        self.title = title
+        self.url = url
+        self.group = TabListModel.group_name(url)
+        self.icon = icon
+
+
+class TabListModel(QAbstractListModel):
+    """Flat list of tab records, optionally filtered and grouped by site.
+
+    Rows are the visible records, with a header string before each group
+    when grouping is on. Title and icon changes only touch their own row;
+    anything that changes which rows are visible (adding, removing,
+    moving, filtering or regrouping tabs) rebuilds the rows once on the
+    next pass through the event loop, however many changes came in.
+    """
+
+    KeyRole = Qt.UserRole + 1
+    HeaderRole = Qt.UserRole + 2
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.records = []
+        self.by_key = {}
+        self.rows = []
+        self.row_of = {}
+        self.grouped = False
+        self.filter_text = ""
+        self.rebuild_timer = QTimer(self)
+        self.rebuild_timer.setSingleShot(True)
+        self.rebuild_timer.timeout.connect(self.rebuild)
+
+    @staticmethod
+    def group_name(url):
+        host = urlsplit(url).hostname or ""
+        return (host[4:] if host.startswith("www.") else host) or "Other"
+
+    def add(self, key, title, url, icon=None, index=None):
+        record = TabRecord(key, title, url, icon or QIcon())
+        self.records.insert(len(self.records) if index is None else index, record)
+        self.by_key[key] = record
+        self.rebuild_timer.start(0)
+
+    def remove(self, key):
+        if (record := self.by_key.pop(key, None)) is not None:
+            self.records.remove(record)
+            self.rebuild_timer.start(0)
+
+    def move(self, key, index):
+        if (record := self.by_key.get(key)) is not None:
+            self.records.remove(record)
+            self.records.insert(index, record)
+            self.rebuild_timer.start(0)
+
+    def update(self, key, title=None, url=None, icon=None):
+        if (record := self.by_key.get(key)) is None:
+            return
+        if title is not None:
+            record.title = title
+        if icon is not None:
+            record.icon = icon
+        relayout = False
+        if url is not None:
+            record.url = url
+            group = self.group_name(url)
+            relayout = self.grouped and group != record.group
+            record.group = group
+        if relayout or (self.filter_text and (title is not None or url is not None)):
+            self.rebuild_timer.start(0)
+        elif (row := self.row_of.get(key)) is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+
+    def set_filter(self, text):
+        self.filter_text = text.strip().lower()
+        self.rebuild()
+
+    def set_grouped(self, grouped):
+        self.grouped = grouped
+        self.rebuild()
+
+    def rebuild(self):
+        self.rebuild_timer.stop()
+        records = self.records
+        if text := self.filter_text:
+            records = [r for r in records if text in r.title.lower() or text in r.url.lower()]
+        if self.grouped:
+            groups = {}
+            for record in records:
+                groups.setdefault(record.group, []).append(record)
+            rows = []
+            for group, members in groups.items():
+                rows.append(f"{group} ({len(members)})")
+                rows.extend(members)
+        else:
+            rows = list(records)
+        
+        self.beginResetModel()
+        self.rows = rows
+        self.row_of = {row.key: i for i, row in enumerate(rows) if not isinstance(row, str)}
+        self.endResetModel()
+
+    def key_at(self, row):
+        return None if isinstance(self.rows[row], str) else self.rows[row].key
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def flags(self, index):
+        if isinstance(self.rows[index.row()], str):
+            return Qt.ItemIsEnabled
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def data(self, index, role=Qt.DisplayRole):
+        row = self.rows[index.row()]
+        if role == self.HeaderRole:
+            return isinstance(row, str)
+        if isinstance(row, str):
+            return row if role == Qt.DisplayRole else None
+        if role == Qt.DisplayRole:
+            return row.title or row.url
+        if role == Qt.DecorationRole:
+            return row.icon
+        if role == Qt.ToolTipRole:
+            return row.url
+        if role == self.KeyRole:
+            return row.key
+        return None
+
+
+class TabListDelegate(QStyledItemDelegate):
+    """Paints tab rows and group headers at a fixed height"""
+
+    ROW_HEIGHT = 26
+    ICON_SIZE = 16
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        rect = option.rect.adjusted(8, 0, -8, 0)
+        font = painter.font()
+        if index.data(TabListModel.HeaderRole):
+            font.setBold(True)
+            painter.setFont(font)
+            painter.setPen(option.palette.placeholderText().color())
+        else:
+            if option.state & QStyle.State_Selected:
+                painter.fillRect(option.rect, option.palette.highlight())
+                painter.setPen(option.palette.highlightedText().color())
+            elif option.state & QStyle.State_MouseOver:
+                painter.fillRect(option.rect, option.palette.alternateBase())
+            icon = index.data(Qt.DecorationRole)
+            if icon is not None and not icon.isNull():
+                icon.paint(painter, QRect(rect.left(), rect.center().y() - self.ICON_SIZE // 2,
+                                          self.ICON_SIZE, self.ICON_SIZE))
+            rect.setLeft(rect.left() + self.ICON_SIZE + 8)
+        text = painter.fontMetrics().elidedText(index.data(), Qt.ElideRight, rect.width())
+        painter.drawText(rect, Qt.AlignVCenter | Qt.AlignLeft, text)
+        painter.restore()
+
+
+class VerticalTabPanel(QDockWidget):
+    """Optional tab list down the side of the window.
+
+    A QListView over TabListModel only lays out and paints the rows on
+    screen, so it stays quick with thousands of tabs where the tab bar
+    does not. While the panel is shown the tab bar is hidden.
+    """
+
+    def __init__(self, window):
+        super().__init__("Tabs", window)
+        self.window = window
+        self.setObjectName("vertical-tabs")
+        self.setFeatures(QDockWidget.DockWidgetClosable | QDockWidget.DockWidgetMovable)
+        
+        container = QWidget()
+        layout = QVBoxLayout(container)
+        layout.setContentsMargins(5, 5, 5, 5)
+        
+        controls = QHBoxLayout()
+        self.filter_box = QLineEdit()
+        self.filter_box.setPlaceholderText("Filter tabs")
+        self.filter_box.setClearButtonEnabled(True)
+        controls.addWidget(self.filter_box)
+        self.group_button = QToolButton()
+        self.group_button.setText("Group")
+        self.group_button.setToolTip("Group tabs by site")
+        self.group_button.setCheckable(True)
+        controls.addWidget(self.group_button)
+        layout.addLayout(controls)
+        
+        self.model = TabListModel(self)
+        self.view = QListView()
+        self.view.setModel(self.model)
+        self.view.setItemDelegate(TabListDelegate(self.view))
+        self.view.setUniformItemSizes(True)
+        self.view.setMouseTracking(True)
+        self.view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.view.clicked.connect(self.activate)
+        layout.addWidget(self.view)
+        self.setWidget(container)
+        
+        self.filter_box.textChanged.connect(self.model.set_filter)
+        self.group_button.toggled.connect(self.model.set_grouped)
+        self.model.modelReset.connect(self.select_current)
+        self.visibilityChanged.connect(lambda visible: window.tabs.tabBar().setVisible(not visible))
+        window.tabs.tabBar().tabMoved.connect(
+            lambda _from, to: self.model.move(window.tabs.widget(to), to))
+        window.tabs.currentChanged.connect(self.select_current)
+        
+        window.addDockWidget(Qt.LeftDockWidgetArea, self)
+        self.setVisible(bool(env_number("NEXIUM_VERTICAL_TABS", 0)))
+
+    def tab_added(self, tab):
+        self.model.add(tab, tab.browser.title(), tab.browser.url().toString(),
+                       index=self.window.tabs.indexOf(tab))
+
+    def tab_removed(self, tab):
+        self.model.remove(tab)
+
+    def tab_changed(self, tab, title=None, url=None, icon=None):
+        self.model.update(tab, title, None if url is None else url.toString(), icon)
+
+    def select_current(self):
+        current = self.window.tabs.currentWidget()
+        if (row := self.model.row_of.get(current)) is not None:
+            index = self.model.index(row)
+            self.view.setCurrentIndex(index)
+            self.view.scrollTo(index)
+
+    def activate(self, index):
+        tab = self.model.key_at(index.row())
+        if tab is not None and (i := self.window.tabs.indexOf(tab)) >= 0:
+            self.window.tabs.setCurrentIndex(i)
+
+
+class TabSwitcherIndex:
+    """Fuzzy search over open tabs, kept current from tab updates.
+
+    Each tab's lowercased title and URL is stored as it changes, so a
+    query never has to ask the tabs for anything. A query that extends
+    the previous one only rescans the previous matches. Substring matches
+    rank above scattered subsequence matches, and ties go to the most
+    recently used tab.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.last_used = {}
+        self.clock = itertools.count(1)
+        self.last_query = None
+        self.last_matches = ()
+
+    def update(self, tab, title, url):
+        self.entries[tab] = f"{title}\n{url}".lower()
+        self.last_query = None
+
+    def remove(self, tab):
+        self.entries.pop(tab, None)
+        self.last_used.pop(tab, None)
+        self.last_query = None
+
+    def touch(self, tab):
+        self.last_used[tab] = next(self.clock)
+
+    @staticmethod
+    def score(query, text):
+        """Higher is better; None if query is not a subsequence of text"""
+        if (pos := text.find(query)) >= 0:
+            return 10000 - pos
+        first = pos = text.find(query[0])
+        for char in query[1:]:
+            if pos < 0:
+                break
+            pos = text.find(char, pos + 1)
+        if pos < 0:
+            return None
+        return -(pos - first)
+
+    def query(self, text, limit=50):
+        text = text.strip().lower()
+        if not text:
+            return heapq.nlargest(limit, self.entries, key=lambda tab: self.last_used.get(tab, 0))
+        if self.last_query and text.startswith(self.last_query):
+            candidates = self.last_matches
+        else:
+            candidates = list(self.entries)
+        
+        scored = []
+        for tab in candidates:
+            if (haystack := self.entries.get(tab)) is not None \
+                    and (score := self.score(text, haystack)) is not None:
+                scored.append((score, self.last_used.get(tab, 0), tab))
+        self.last_query = text
+        self.last_matches = [tab for _, _, tab in scored]
+        return [tab for _, _, tab in heapq.nlargest(limit, scored, key=lambda m: m[:2])]
+
+
+class TabSwitcher(QDialog):
+    """Ctrl+K popup that jumps to any open tab, in any window, by fuzzy title or URL"""
+
+    def __init__(self, window):
+        super().__init__(window, Qt.Popup)
+        self.window = window
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.setMinimumWidth(600)
+        
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(5, 5, 5, 5)
+        
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("Switch to tab")
+        self.search_box.textChanged.connect(self.search)
+        self.search_box.returnPressed.connect(self.open_current)
+        self.search_box.installEventFilter(self)
+        layout.addWidget(self.search_box)
+        
+        self.results = QListWidget()
+        self.results.setUniformItemSizes(True)
+        self.results.itemActivated.connect(self.open_item)
+        layout.addWidget(self.results)
+        
+        geometry = window.geometry()
+        self.move(geometry.center().x() - self.minimumWidth() // 2, geometry.top() + 80)
+        self.search("")
+
+    def eventFilter(self, obj, event):
+        # Arrow keys move through the results while typing continues
+        if event.type() == QEvent.KeyPress and event.key() in (Qt.Key_Up, Qt.Key_Down):
+            step = -1 if event.key() == Qt.Key_Up else 1
+            self.results.setCurrentRow(max(0, min(self.results.count() - 1,
+                                                  self.results.currentRow() + step)))
+            return True
+        return False
+
+    def search(self, text):
+        self.results.clear()
+        for tab in self.window.tab_index.query(text):
+            title = tab.browser.title() or tab.browser.url().toString()
+            if tab.page.lifecycleState() == QWebEnginePage.LifecycleState.Discarded:
+                title += " (hibernated)"
+            item = QListWidgetItem(self.window.favicons.icon_for(tab.browser.url()),
+                                   f"{title}\n{tab.browser.url().toString()}")
+            item.setData(Qt.UserRole, tab)
+            self.results.addItem(item)
+        self.results.setCurrentRow(0)
+
+    def open_current(self):
+        if item := self.results.currentItem():
+            self.open_item(item)
+
+    def open_item(self, item):
+        # The tab may be in another window
+        tab = item.data(Qt.UserRole)
+        window = tab.page.browser_window
+        if window is not None and (index := window.tabs.indexOf(tab)) >= 0:
+            window.tabs.setCurrentIndex(index)
+            window.raise_()
+            window.activateWindow()
+        self.close()
+
+
+class ClosedTabPool(QObject):
+    """Keeps recently closed tabs alive so they can be reopened as they were.
+
+    A closed tab is hidden, muted and frozen instead of destroyed, and
+    reopening it puts the same page back with its scroll position and
+    form contents. Tabs leave the pool after a while, or when it is full,
+    and are then torn down a few at a time so closing many heavy pages
+    never blocks the UI in one go. Torn-down tabs are still remembered by
+    URL and reopen with a fresh load.
+    """
+
+    TEARDOWN_INTERVAL_MS = 250
+    TEARDOWN_BATCH = 1
+    EXPIRY_CHECK_MS = 10000
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        self.max_tabs = int(env_number("NEXIUM_CLOSED_TABS", 5))
+        self.keep_seconds = env_number("NEXIUM_CLOSED_TAB_SECONDS", 300)
+        self.pool = deque()
+        self.closed_urls = deque(maxlen=25)
+        self.teardown_queue = deque()
+        
+        self.teardown_timer = QTimer(self)
+        self.teardown_timer.timeout.connect(self.tear_down_batch)
+        self.expiry_timer = QTimer(self)
+        self.expiry_timer.timeout.connect(self.expire)
+        self.expiry_timer.start(self.EXPIRY_CHECK_MS)
+
+    def add(self, tab, index):
+        """Take a tab that has just been removed from the tab strip"""
+        tab.hide()
+        tab.was_muted = tab.page.isAudioMuted()
+        tab.page.setAudioMuted(True)
+        if tab.page.lifecycleState() == QWebEnginePage.LifecycleState.Active:
+            tab.page.setLifecycleState(QWebEnginePage.LifecycleState.Frozen)
+        flight_recorder.record("closed", tab.tab_id, tab.browser.url().toString())
+        self.pool.append((tab, index, time.monotonic()))
+        while len(self.pool) > self.max_tabs:
+            self.tear_down(self.pool.popleft()[0])
+
+    def expire(self):
+        deadline = time.monotonic() - self.keep_seconds
+        while self.pool and self.pool[0][2] < deadline:
+            self.tear_down(self.pool.popleft()[0])
+
+    def tear_down(self, tab):
+        if not (url := tab.effective_url()).isEmpty():
+            self.closed_urls.append((url, tab.container))
+        self.teardown_queue.append(tab)
+        if not self.teardown_timer.isActive():
+            self.teardown_timer.start(self.TEARDOWN_INTERVAL_MS)
+
+    def tear_down_batch(self):
+        for _ in range(min(self.TEARDOWN_BATCH, len(self.teardown_queue))):
+            self.teardown_queue.popleft().deleteLater()
+        if not self.teardown_queue:
+            self.teardown_timer.stop()
+
+    def reopen(self):
+        """Bring back the most recently closed tab"""
+        if self.pool:
+            tab, index, _ = self.pool.pop()
+            tab.page.setLifecycleState(QWebEnginePage.LifecycleState.Active)
+            tab.page.setAudioMuted(tab.was_muted)
+            self.window.attach_tab(tab, min(index, self.window.tabs.count()))
+            self.window.context.tab_url_changed(tab, tab.browser.url())
+            flight_recorder.record("reopened", tab.tab_id, tab.browser.url().toString())
+        elif self.closed_urls:
+            url, container = self.closed_urls.pop()
+            self.window.add_new_tab(url, container=container)
+
+    def clear(self):
+        """Tear everything down now, e.g. when the window closes"""
+        while self.pool:
+            self.pool.popleft()[0].deleteLater()
+        while self.teardown_queue:
+            self.teardown_queue.popleft().deleteLater()
+
+
+class SnapshotPlaceholder(QLabel):
+    """Last known picture of a tab, shown over it until its page loads"""
+
+    FADE_MS = 250
+    TIMEOUT_MS = 15000
+
+    def __init__(self, tab, pixmap):
+        super().__init__(tab)
+        self.tab = tab
+        self.setPixmap(pixmap)
+        self.setScaledContents(True)
+        self.setGeometry(tab.rect())
+        tab.installEventFilter(self)
+        tab.placeholder = self
+        self.raise_()
+        self.show()
+        
+        tab.page.loadFinished.connect(self.fade_out)
+        # Don't leave a stale picture up if the page never finishes
+        self.timeout = QTimer(self)
+        self.timeout.setSingleShot(True)
+        self.timeout.timeout.connect(self.fade_out)
+        self.timeout.start(self.TIMEOUT_MS)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Resize:
+            self.setGeometry(self.tab.rect())
+        return False
+
+    def fade_out(self):
+        if self.tab.placeholder is not self:
+            return
+        self.tab.placeholder = None
+        self.timeout.stop()
+        self.tab.page.loadFinished.disconnect(self.fade_out)
+        self.tab.removeEventFilter(self)
+        effect = QGraphicsOpacityEffect(self)
+        self.setGraphicsEffect(effect)
+        self.animation = QPropertyAnimation(effect, b"opacity", self)
+        self.animation.setDuration(self.FADE_MS)
+        self.animation.setStartValue(1.0)
+        self.animation.setEndValue(0.0)
+        self.animation.finished.connect(self.deleteLater)
+        self.animation.start()
+
+
+class SessionStore(QObject):
+    """Saves the open tabs at shutdown and restores them behind snapshots.
+
+    session.json lists each tab's URL and title, next to one JPEG per
+    tab. The current tab is grabbed at full size; the others reuse their
+    overview thumbnail, which is enough for a placeholder. On the next
+    start every tab shows its snapshot straight away while the page loads
+    underneath, and the snapshot fades out once the load finishes.
+    """
+
+    SNAPSHOT_QUALITY = 60
+
+    def __init__(self, context):
+        super().__init__(context)
+        self.context = context
+        self.path = os.path.join(context.storage_path, "session.json")
+        self.snapshot_dir = os.path.join(context.storage_path, "session")
+
+    def save(self):
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        for name in os.listdir(self.snapshot_dir):
+            os.remove(os.path.join(self.snapshot_dir, name))
+        
+        windows = []
+        for window in self.context.windows:
+            tabs = window.tabs
+            current = tabs.currentWidget()
+            entries, current_index = [], 0
+            for i in range(tabs.count()):
+                tab = tabs.widget(i)
+                url = tab.effective_url()
+                if url.isEmpty() or url.scheme() in ("about", "data"):
+                    continue
+                if tab is current:
+                    current_index = len(entries)
+                    buffer = QBuffer()
+                    buffer.open(QIODevice.WriteOnly)
+                    tab.browser.grab().save(buffer, "JPEG", self.SNAPSHOT_QUALITY)
+                    data = bytes(buffer.data())
+                else:
+                    data = self.context.thumbnails.load(tab.tab_id)
+                entry = {"url": url.toString(), "title": tab.browser.title() or url.toString()}
+                if tab.container:
+                    entry["container"] = tab.container
+                if data:
+                    entry["snapshot"] = f"{len(windows)}-{len(entries)}.jpg"
+                    with open(os.path.join(self.snapshot_dir, entry["snapshot"]), "wb") as f:
+                        f.write(data)
+                entries.append(entry)
+            if entries:
+                windows.append({"current": current_index, "tabs": entries})
+        
+        with open(self.path + ".tmp", "w") as f:
+            json.dump({"windows": windows}, f)
+        os.replace(self.path + ".tmp", self.path)
+
+    def restore(self):
+        """Reopen the saved windows; returns False if there was nothing to restore"""
+        try:
+            with open(self.path) as f:
+                session = json.load(f)
+        except (OSError, ValueError):
+            return False
+        # Sessions from before multiple windows hold one window's tabs
+        saved_windows = session.get("windows") or [session]
+        restored = False
+        for saved in saved_windows:
+            if not saved.get("tabs"):
+                continue
+            window = self.context.new_window()
+            for entry in saved["tabs"]:
+                tab = window.add_new_tab(entry["url"], container=entry.get("container"))
+                if entry.get("title"):
+                    window.tab_updates.mark(tab, "title", entry["title"])
+                pixmap = QPixmap()
+                if entry.get("snapshot") and pixmap.load(os.path.join(self.snapshot_dir, entry["snapshot"])):
+                    SnapshotPlaceholder(tab, pixmap)
+            window.tabs.setCurrentIndex(saved.get("current", 0))
+            restored = True
+        return restored
+
+
+class PopupWindow(QDialog):
+    """Separate window for popups and dialogs opened by a page"""
+
+    def __init__(self, window, container=None):
+        super().__init__(window)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        self.resize(640, 480)
+        
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.tab = window.create_tab(container)
+        # Popups can open popups of their own
+        self.tab.page.browser_window = window
+        layout.addWidget(self.tab)
+        
+        self.tab.browser.titleChanged.connect(self.setWindowTitle)
+        self.tab.page.geometryChangeRequested.connect(self.setGeometry)
+        self.tab.page.windowCloseRequested.connect(self.close)
+        self.show()
+
+
+THEMES = {
+    "dark": {
+        "background": "#1e1e1e",
+        "surface": "#252525",
+        "control": "#333",
+        "hover": "#404040",
+        "selected": "#505050",
+        "border": "#444",
+        "accent": "#4CAF50",
+        "text": "#fff",
+        "code_background": "#1e1e1e",
+        "code_text": "#e0e0e0",
+        "code_selection": "#3a3a3a",
+    },
+    "light": {
+        "background": "#f3f3f3",
+        "surface": "#fafafa",
+        "control": "#e6e6e6",
+        "hover": "#d6d6d6",
+        "selected": "#fff",
+        "border": "#c8c8c8",
+        "accent": "#2e7d32",
+        "text": "#1e1e1e",
+        "code_background": "#fff",
+        "code_text": "#202020",
+        "code_selection": "#cde3cd",
+    },
+}
+
+STYLESHEET = """
+    QMainWindow {
+        background-color: %(background)s;
+        color: %(text)s;
+    }
+    QTabWidget::pane {
+        border: 0;
+        background: %(surface)s;
+    }
+    QTabBar::tab {
+        background: %(control)s;
+        color: %(text)s;
+        padding: 8px 15px;
+        border-top-left-radius: 5px;
+        border-top-right-radius: 5px;
+        margin-right: 2px;
+        font-size: 12px;
+        min-width: 100px;
+    }
+    QTabBar::tab:selected {
+        background: %(selected)s;
+        border-bottom: 2px solid %(accent)s;
+    }
+    QTabBar::tab:hover {
+        background: %(hover)s;
+    }
+    QLineEdit {
+        background: %(control)s;
+        color: %(text)s;
+        border: 1px solid %(border)s;
+        border-radius: 15px;
+        padding: 8px 15px;
+        font-size: 14px;
+        selection-background-color: %(accent)s;
+    }
+    QMenuBar {
+        background: %(surface)s;
+        color: %(text)s;
+        padding: 4px;
+    }
+    QMenuBar::item {
+        background: transparent;
+        padding: 5px 10px;
+        border-radius: 4px;
+    }
+    QMenuBar::item:selected {
+        background: %(hover)s;
+    }
+    QMenu {
+        background: %(control)s;
+        color: %(text)s;
+        border: 1px solid %(border)s;
+        padding: 8px;
+    }
+    QMenu::item {
+        padding: 5px 25px 5px 20px;
+        border-radius: 4px;
+    }
+    QMenu::item:selected {
+        background: %(accent)s;
+        color: #fff;
+    }
+    QMenu::separator {
+        height: 1px;
+        background: %(border)s;
+        margin: 5px 0;
+    }
+    QToolBar#main-toolbar {
+        background: %(surface)s;
+        border: none;
+        padding: 0;
+    }
+    QToolBar#main-toolbar QToolButton {
+        padding: 5px 10px;
+        border-radius: 5px;
+        color: %(text)s;
+        background: transparent;
+    }
+    QToolBar#main-toolbar QToolButton:hover {
+        background: %(hover)s;
+    }
+    QTextEdit#page-source {
+        background-color: %(code_background)s;
+        color: %(code_text)s;
+        font-family: Consolas, 'Courier New', monospace;
+        font-size: 12px;
+        border: 1px solid %(border)s;
+        selection-background-color: %(code_selection)s;
+        padding: 10px;
+    }
+"""
+
+
+class ThemeEngine:
+    """Styles every window and dialog from one application stylesheet.
+
+    Each setStyleSheet call on a widget makes Qt re-parse the sheet and
+    re-polish that widget and its children, and every new window, toolbar
+    button and inspector used to pay for its own. Now a theme's colours
+    are filled into STYLESHEET once, the result is cached, and it is set
+    on the application; widgets that need their own look are picked out
+    by object name. Switching theme replaces that one stylesheet.
+    """
+
+    def __init__(self):
+        self.compiled = {}
+        self.current = None
+
+    def stylesheet(self, name):
+        if name not in self.compiled:
+            self.compiled[name] = STYLESHEET % THEMES[name]
+        return self.compiled[name]
+
+    def apply(self, name):
+        if name not in THEMES:
+            name = "dark"
+        if name != self.current:
+            QApplication.instance().setStyleSheet(self.stylesheet(name))
+            self.current = name
+
+
+theme_engine = ThemeEngine()
 
 
 class PageInspector(QDialog):
@@ -27,24 +3514,15 @@ class PageInspector(QDialog):
         self.text_edit = QTextEdit()
         self.text_edit.setPlainText(page_source)
         self.text_edit.setReadOnly(True)
-        self.text_edit.setStyleSheet("""
-            QTextEdit {
-                background-color: #1e1e1e;  /* Dark gray background */
-                color: #e0e0e0;             /* Light gray text */
-                font-family: Consolas, 'Courier New', monospace;
-                font-size: 12px;
-                border: 1px solid #444;
-                selection-background-color: #3a3a3a;
-                padding: 10px;
-            }
-        """)
+        # Styled by the application theme
+        self.text_edit.setObjectName("page-source")
         
         # Make the text edit fill all available space
         layout.addWidget(self.text_edit)
 
 
 class BrowserTab(QWidget):
-    def __init__(self, profile, parent=None):
+    def __init__(self, profile, parent=None, page=None):
         super().__init__(parent)
         self.layout = QVBoxLayout(self)
         self.layout.setContentsMargins(0, 0, 0, 0)
@@ -52,38 +3530,134 @@ class BrowserTab(QWidget):
         
         self.browser = QWebEngineView()
         self.profile = profile
+        self.tab_id = next(_tab_ids)
+        self.attached = False
+        self.container = None
         
-        # Create page with the shared profile
-        self.page = QWebEnginePage(self.profile, self.browser)
+        # Create page with the shared profile, unless one was built ahead of time
+        self.page = page if page is not None else NexiumPage(self.profile)
+        self.page.setParent(self.browser)
+        self.page.tab_id = self.tab_id
         self.browser.setPage(self.page)
+        self.page.urlChanged.connect(
+            lambda url: flight_recorder.record("navigate", self.tab_id, url.toString()))
         
         # Connect permission signals
         self.page.featurePermissionRequested.connect(self.handle_permission_request)
         
+        # Feed page load latency and renderer crashes into the metrics
+        self.load_started_at = None
+        self.page.loadStarted.connect(self.record_load_started)
+        self.page.loadFinished.connect(self.record_load_finished)
+        self.page.renderProcessTerminated.connect(self.record_render_process_terminated)
+        
+        # Navigation tracing hooks are only wired up when tracing is on
+        if tracer.enabled:
+            self.trace_span = None
+            self.trace_milestone = 0
+            self.page.loadStarted.connect(self.trace_load_started)
+            self.page.loadProgress.connect(self.trace_load_progress)
+            self.page.loadFinished.connect(self.trace_load_finished)
+            self.browser.titleChanged.connect(
+                lambda title: tracer.instant("titleChanged", self.tab_id, self.trace_span, title=title))
+            self.browser.iconChanged.connect(
+                lambda icon: tracer.instant("iconChanged", self.tab_id, self.trace_span))
+        
         # Enable context menu
         self.browser.setContextMenuPolicy(Qt.CustomContextMenu)
         self.browser.customContextMenuRequested.connect(self.show_context_menu)
         
-        self.browser.setUrl(QUrl("https://nexucore.github.io/Synax/"))
         self.layout.addWidget(self.browser)
 
+    def effective_url(self):
+        """URL the tab shows, or will show once its deferred first load starts"""
+        return self.page.deferred_url or self.browser.url()
+
     def handle_permission_request(self, securityOrigin, feature):
         """Automatically grant all permission requests"""
+        flight_recorder.record("permission", self.tab_id,
+                               f"{securityOrigin.toString()} feature={int(feature)} granted")
         self.page.setFeaturePermission(securityOrigin, feature, QWebEnginePage.PermissionGrantedByUser)
 
+    def kill_and_reload(self):
+        """Terminate the renderer; the watchdog reloads the tab straight away"""
+        pid = self.page.renderProcessPid()
+        if not pid:
+            self.browser.reload()
+            return
+        flight_recorder.record("kill", self.tab_id, f"renderer {pid}")
+        self.restore_immediately = True
+        try:
+            os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+        except OSError:
+            self.restore_immediately = False
+            self.browser.reload()
+
+    def record_load_started(self):
+        self.load_started_at = time.monotonic()
+
+    def record_load_finished(self, ok):
+        if self.load_started_at is not None:
+            metrics.observe_load(time.monotonic() - self.load_started_at)
+            self.load_started_at = None
+        if not ok:
+            metrics.inc("nexium_load_failures_total")
+            flight_recorder.record("load-failed", self.tab_id, self.page.url().toString())
+
+    def record_render_process_terminated(self, status, exit_code):
+        statuses = {QWebEnginePage.NormalTerminationStatus: "normal",
+                    QWebEnginePage.AbnormalTerminationStatus: "abnormal",
+                    QWebEnginePage.CrashedTerminationStatus: "crashed",
+                    QWebEnginePage.KilledTerminationStatus: "killed"}
+        metrics.inc("nexium_renderer_terminations_total", status=statuses.get(status, "unknown"))
+        flight_recorder.record("renderer-terminated", self.tab_id,
+                               f"{statuses.get(status, 'unknown')} exit_code={exit_code} "
+                               f"url={self.page.url().toString()}")
+        if status != QWebEnginePage.NormalTerminationStatus:
+            flight_recorder.dump("renderer")
+
     def navigate_to(self, url_or_query):
         """Navigate to URL or perform search query"""
-        if not url_or_query:
+        if not url_or_query.strip():
             return
+        
+        if tracer.enabled:
+            start_ts = tracer.now()
+            self.trace_begin("navigation", input=url_or_query)
             
-        if ('.' in url_or_query or 
-            url_or_query.startswith(('http://', 'https://', 'file://'))):
-            if not url_or_query.startswith(('http://', 'https://', 'file://')):
-                url_or_query = 'https://' + url_or_query
-            self.browser.setUrl(QUrl(url_or_query))
-        else:
-            search_url = f"https://nexucore.github.io/Synax/?q={url_or_query}"
-            self.browser.setUrl(QUrl(search_url))
+        self.browser.setUrl(QUrl(url_resolver.resolve(url_or_query)))
+        
+        if tracer.enabled:
+            tracer.complete("navigate_to", self.tab_id, start_ts,
+                            url=self.browser.url().toString())
+
+    def trace_begin(self, name, **args):
+        """Start a navigation span, closing any span left open by an aborted load"""
+        if self.trace_span is not None:
+            tracer.end("navigation", self.trace_span, self.tab_id, aborted=True)
+        self.trace_span = tracer.begin(name, self.tab_id, **args)
+        self.trace_milestone = 0
+
+    def trace_load_started(self):
+        # Link clicks, reloads and redirects start a span of their own
+        if self.trace_span is None:
+            self.trace_begin("navigation", url=self.page.requestedUrl().toString())
+        tracer.instant("loadStarted", self.tab_id, self.trace_span)
+
+    def trace_load_progress(self, progress):
+        # Only record the first crossing of each quarter to keep traces small
+        milestone = progress // 25 * 25
+        if self.trace_span is not None and milestone > self.trace_milestone:
+            self.trace_milestone = milestone
+            tracer.instant(f"loadProgress {milestone}%", self.tab_id, self.trace_span)
+
+    def trace_load_finished(self, ok):
+        if self.trace_span is None:
+            return
+        tracer.instant("loadFinished", self.tab_id, self.trace_span, ok=ok)
+        tracer.end("navigation", self.trace_span, self.tab_id,
+                   url=self.page.url().toString(), ok=ok)
+        self.trace_span = None
             
     def show_context_menu(self, pos):
         """Custom context menu with Inspect option"""
@@ -120,11 +3694,161 @@ class BrowserTab(QWidget):
         self.page.toHtml(handle_source_received)
 
 
-class SynaxBrowser(QMainWindow):
+class ContainerProfiles(QObject):
+    """Named profiles that keep their cookies, storage and cache apart.
+
+    Each container has its own directory under storage_path/containers,
+    so two tabs can be logged into the same site as different users and
+    nothing a container loads ends up in the default profile's cache. A
+    container's profile is only created when a tab needs it and is
+    counted per tab; once its last tab is gone (including from the
+    closed tab pool) it is torn down after a short grace period.
+    Containers are always keyed by their directory name, so two
+    spellings can never share one storage directory.
+    """
+
+    TEARDOWN_DELAY_MS = 10000
+
+    def __init__(self, context):
+        super().__init__(context)
+        self.root = os.path.join(context.storage_path, "containers")
+        self.profiles = {}
+        self.users = {}
+
+    NAME_PATTERN = re.compile(r"[^A-Za-z0-9 _-]")
+
+    @classmethod
+    def directory_name(cls, name):
+        return cls.NAME_PATTERN.sub("_", name.strip())
+
+    @classmethod
+    def valid_name(cls, name):
+        """True if the name can be used as its own directory name"""
+        return bool(name) and name == cls.directory_name(name)
+
+    @staticmethod
+    def color(name):
+        """Stable tab colour for a container"""
+        hue = int(hashlib.sha1(name.encode()).hexdigest()[:4], 16) % 360
+        return QColor.fromHsv(hue, 160, 220)
+
+    def names(self):
+        """Containers in use or with storage on disk"""
+        on_disk = os.listdir(self.root) if os.path.isdir(self.root) else []
+        return sorted(set(self.profiles) | set(on_disk))
+
+    def acquire(self, name):
+        """Profile for a new tab in the named container; release() it when the tab is gone"""
+        name = self.directory_name(name)
+        if (profile := self.profiles.get(name)) is None:
+            path = os.path.join(self.root, name)
+            os.makedirs(path, exist_ok=True)
+            profile = QWebEngineProfile(f"NexiumContainer-{name}", self)
+            profile.setPersistentStoragePath(path)
+            profile.setPersistentCookiesPolicy(QWebEngineProfile.ForcePersistentCookies)
+            profile.setCachePath(os.path.join(path, "cache"))
+            profile.setHttpCacheType(QWebEngineProfile.DiskHttpCache)
+            self.profiles[name] = profile
+            flight_recorder.record("container", 0, f"{name} created")
+        self.users[name] = self.users.get(name, 0) + 1
+        return profile
+
+    def release(self, name):
+        name = self.directory_name(name)
+        self.users[name] -= 1
+        if not self.users[name]:
+            # Pages go away after their tab; give them (and a quick reopen) time
+            QTimer.singleShot(self.TEARDOWN_DELAY_MS, lambda: self.tear_down(name))
+
+    def tear_down(self, name):
+        if self.users.get(name) or name not in self.profiles:
+            return
+        del self.users[name]
+        self.profiles.pop(name).deleteLater()
+        flight_recorder.record("container", 0, f"{name} torn down")
+
+
+class DetachableTabBar(QTabBar):
+    """Tab bar whose tabs can be dragged into another window or out into a new one"""
+
+    DETACH_DISTANCE = 30
+
+    def __init__(self, window):
+        super().__init__()
+        self.window = window
+        self.press_index = -1
+        self.setAcceptDrops(True)
+
+    def paintEvent(self, event):
+        """Mark container tabs with a stripe in the container's colour"""
+        super().paintEvent(event)
+        painter = QPainter(self)
+        for i in range(self.count()):
+            if container := self.tabData(i):
+                rect = self.tabRect(i)
+                painter.fillRect(rect.x() + 4, rect.y(), rect.width() - 8, 3,
+                                 ContainerProfiles.color(container))
+        painter.end()
+
+    def mousePressEvent(self, event):
+        self.press_index = self.tabAt(event.pos()) if event.button() == Qt.LeftButton else -1
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        margin = self.DETACH_DISTANCE
+        if self.press_index >= 0 and event.buttons() & Qt.LeftButton and \
+                not self.rect().adjusted(-margin, -margin, margin, margin).contains(event.pos()):
+            tab = self.window.tabs.widget(self.press_index)
+            self.press_index = -1
+            # Let the bar finish its own tab move before the window drag starts
+            super().mouseReleaseEvent(QMouseEvent(QEvent.MouseButtonRelease, event.localPos(),
+                                                  Qt.LeftButton, Qt.NoButton, Qt.NoModifier))
+            self.window.drag_tab(tab)
+            return
+        super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        self.press_index = -1
+        super().mouseReleaseEvent(event)
+
+    def dragEnterEvent(self, event):
+        if event.mimeData().hasFormat(BrowserContext.TAB_MIME_TYPE):
+            event.acceptProposedAction()
+
+    def dragMoveEvent(self, event):
+        if event.mimeData().hasFormat(BrowserContext.TAB_MIME_TYPE):
+            event.acceptProposedAction()
+
+    def dropEvent(self, event):
+        tab_id = int(bytes(event.mimeData().data(BrowserContext.TAB_MIME_TYPE)).decode())
+        if tab := self.window.context.find_tab(tab_id):
+            self.window.context.move_tab(tab, self.window, self.tabAt(event.pos()))
+            event.acceptProposedAction()
+
+
+class BrowserTabWidget(QTabWidget):
+    """Tab widget using a tab bar that supports dragging tabs between windows"""
+
+    def __init__(self, window):
+        super().__init__()
+        self.setTabBar(DetachableTabBar(window))
+
+
+class BrowserContext(QObject):
+    """Everything the browser windows share.
+
+    There is one profile, history database, favicon store, URL bar index,
+    thumbnail cache, tab switcher index, renderer watchdog and hang
+    detector however many windows are open, so a tab (page, renderer and
+    all) can move to another window by reparenting it. The context keeps
+    track of the open windows, samples metrics across all of them and
+    saves the session when the last one closes.
+    """
+
+    TAB_MIME_TYPE = "application/x-nexium-tab"
+
     def __init__(self):
         super().__init__()
-        self.setWindowTitle("Nexium Browser")
-        
         # Set up persistent storage
         self.storage_path = os.path.join(
             QStandardPaths.writableLocation(QStandardPaths.AppDataLocation),
@@ -134,16 +3858,12 @@ class SynaxBrowser(QMainWindow):
         # Create directory if it doesn't exist
         if not os.path.exists(self.storage_path):
             os.makedirs(self.storage_path)
+        flight_recorder.dump_dir = os.path.join(self.storage_path, "flight-recorder")
         
-        def update_url_bar(self, index):
-            """Update URL bar and window title when tab changes"""
-            if index >= 0 and (current_widget := self.tabs.widget(index)):
-                url = current_widget.browser.url().toString()
-                self.url_bar.setText(url)
-                
-                # Update window title with current tab's title
-                title = self.tabs.tabText(index)
-                self.setWindowTitle(f"{title} - Nexium Browser")
+        # An up-to-date public suffix list, if provided, extends the built-in rules
+        suffix_list = os.path.join(self.storage_path, "public_suffix_list.dat")
+        if os.path.exists(suffix_list):
+            PublicSuffixTrie.from_file(suffix_list, url_resolver.suffixes)
 
         # Create a persistent profile for all tabs
         self.profile = QWebEngineProfile("NexiumBrowserProfile", self)
@@ -154,23 +3874,238 @@ class SynaxBrowser(QMainWindow):
 
         # Enable persistent cookies and sessions
         self.profile.setPersistentCookiesPolicy(QWebEngineProfile.ForcePersistentCookies)
+        self.spare_pages = SparePagePool(self.profile, self)
         # self.profile.setHttpUserAgent("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.5735.199 Safari/537.36 Edg/114.0.1823.67")
         
         # Initialize network manager for downloading logo
         self.network_manager = QNetworkAccessManager()
-        self.network_manager.finished.connect(self.logo_downloaded)
+        
+        # Search suggestions share the network manager with the logo download
+        self.search_suggestions = SearchSuggestionProvider(
+            self.network_manager, os.environ.get("NEXIUM_SUGGEST_URL", SUGGEST_URL), self)
+        
+        self.history = HistoryStore(os.path.join(self.storage_path, "history.sqlite"), self)
+        self.favicons = FaviconStore(self.history, self)
+        self.link_prefetcher = LinkPrefetcher(self)
+        self.cache_warmer = CacheWarmer(self)
+        self.thumbnails = ThumbnailCache(self)
+        self.watchdog = RendererWatchdog(self)
+        self.hang_detector = HangDetector(self)
+        self.tab_index = TabSwitcherIndex()
+        self.session = SessionStore(self)
+        self.containers = ContainerProfiles(self)
+        self.windows = []
+        self.quitting = False
+        
+        self.theme_path = os.path.join(self.storage_path, "theme")
+        try:
+            with open(self.theme_path) as f:
+                self.theme = f.read().strip()
+        except OSError:
+            self.theme = os.environ.get("NEXIUM_THEME", "dark")
+        theme_engine.apply(self.theme)
+        
+        self.omnibox = OmniboxIndex()
+        self.history.visited.connect(lambda url, title: self.omnibox.record_visit(url, title))
+        self.history.titled.connect(lambda url, title: self.omnibox.record_title(url, title))
+        # Build the full index on the history worker, then swap it in
+        self.history.query(OmniboxIndex.from_database, self.set_omnibox)
+        url_resolver.known_scheme = lambda host: self.omnibox.hosts.get(host)
+        
+        self.setup_metrics()
+
+    def set_omnibox(self, index):
+        if index is None:
+            return
+        index.merge(self.omnibox)
+        self.omnibox = index
+
+    def set_theme(self, name):
+        """Switch every window to another theme and remember it"""
+        theme_engine.apply(name)
+        self.theme = theme_engine.current
+        for window in self.windows:
+            window.theme_actions[self.theme].setChecked(True)
+        try:
+            with open(self.theme_path, "w") as f:
+                f.write(self.theme)
+        except OSError as e:
+            print("Saving theme failed:", e)
+
+    def start(self):
+        """Open the saved session, or a window with the home page"""
+        if not self.session.restore():
+            self.new_window().add_new_tab(home=True)
+
+    def new_window(self):
+        window = SynaxBrowser(self)
+        self.windows.append(window)
+        window.show()
+        return window
+
+    def all_tabs(self):
+        for window in self.windows:
+            yield from (window.tabs.widget(i) for i in range(window.tabs.count()))
+
+    def find_tab(self, tab_id):
+        return next((tab for tab in self.all_tabs() if tab.tab_id == tab_id), None)
+
+    def watch(self, tab):
+        """Hook a tab up to the shared services, once in its lifetime"""
+        self.history.watch(tab)
+        self.favicons.watch(tab)
+        self.thumbnails.watch(tab)
+        self.link_prefetcher.watch(tab)
+        # Keep the open-tab flags in the URL bar index in step with the tab's URL
+        tab.omnibox_url = None
+        tab.browser.urlChanged.connect(lambda url: self.tab_url_changed(tab, url))
+
+    def tab_url_changed(self, tab, url):
+        if tab.omnibox_url:
+            self.omnibox.tab_closed(tab.omnibox_url)
+        tab.omnibox_url = None
+        if url.scheme() in HistoryStore.RECORDED_SCHEMES:
+            tab.omnibox_url = url.toString(QUrl.RemoveFragment)
+            self.omnibox.tab_opened(tab.omnibox_url, tab.browser.title())
+
+    def tab_closed(self, tab):
+        if getattr(tab, "omnibox_url", None):
+            self.omnibox.tab_closed(tab.omnibox_url)
+            tab.omnibox_url = None
+        self.thumbnails.forget(tab)
+        self.hang_detector.forget(tab)
+        self.tab_index.remove(tab)
+
+    def move_tab(self, tab, target, index=-1):
+        """Move a live tab into another window (or to another spot in its own)"""
+        source = tab.page.browser_window
+        if source is target:
+            if index >= 0:
+                source.tabs.tabBar().moveTab(source.tabs.indexOf(tab), index)
+            return
+        flight_recorder.record("move", tab.tab_id, f"to window {self.windows.index(target)}")
+        source.detach_tab(tab)
+        target.attach_tab(tab, index if index >= 0 else None)
+        self.hang_detector.tab_moved(tab)
+        target.activateWindow()
+        if source.tabs.count() == 0:
+            source.close()
+
+    def save_session(self):
+        try:
+            self.session.save()
+        except OSError as e:
+            print("Saving session failed:", e)
+
+    def quit(self):
+        """Save every window into the session and close them all"""
+        self.save_session()
+        self.quitting = True
+        for window in list(self.windows):
+            window.close()
+
+    def window_closing(self, window):
+        if window not in self.windows:
+            return
+        # Closing the last window ends the session
+        last = len(self.windows) == 1
+        if last and not self.quitting:
+            self.save_session()
+        # The window's tabs go with it
+        for i in range(window.tabs.count()):
+            self.tab_closed(window.tabs.widget(i))
+        if last:
+            self.history.close()
+            self.thumbnails.close()
+        self.windows.remove(window)
+
+    def setup_metrics(self):
+        """Sample cheap browser state for the metrics exporter"""
+        metrics.cache_path = self.profile.cachePath()
+        self.stall_monitor = StallMonitor(self)
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.timeout.connect(self.sample_metrics)
+        self.metrics_timer.start(5000)
+        self.sample_metrics()
+        
+        self.memory_sample_timer = QTimer(self)
+        self.memory_sample_timer.timeout.connect(self.sample_memory)
+        self.memory_sample_timer.start(30000)
+
+    def sample_memory(self):
+        """Log browser and renderer memory to the flight recorder"""
+        browser_rss = process_memory(os.getpid()) or 0
+        renderer_rss = sum(filter(None, (process_memory(pid) for pid in metrics.renderer_pids)))
+        flight_recorder.record("memory", 0, f"browser={browser_rss // 1048576}MB "
+                               f"renderers={renderer_rss // 1048576}MB "
+                               f"tabs={sum(1 for _ in self.all_tabs())} windows={len(self.windows)}")
+
+    def sample_metrics(self):
+        """Record tab and renderer counts; memory is read by the exporter thread"""
+        tabs = list(self.all_tabs())
+        pids = {tab.page.renderProcessPid() for tab in tabs}
+        pids.discard(0)
+        metrics.set_gauge("nexium_tabs", len(tabs))
+        with metrics.lock:
+            metrics.renderer_pids = tuple(pids)
+
+
+class SynaxBrowser(QMainWindow):
+    def __init__(self, context):
+        super().__init__()
+        self.setWindowTitle("Nexium Browser")
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        
+        # Shared with the other windows
+        self.context = context
+        self.storage_path = context.storage_path
+        self.profile = context.profile
+        self.spare_pages = context.spare_pages
+        self.network_manager = context.network_manager
+        self.search_suggestions = context.search_suggestions
+        self.history = context.history
+        self.favicons = context.favicons
+        self.thumbnails = context.thumbnails
+        self.watchdog = context.watchdog
+        self.hang_detector = context.hang_detector
+        
+        def update_url_bar(self, index):
+            """Update URL bar and window title when tab changes"""
+            if index >= 0 and (current_widget := self.tabs.widget(index)):
+                url = current_widget.browser.url().toString()
+                self.url_bar.setText(url)
+                
+                # Update window title with current tab's title
+                title = self.tabs.tabText(index)
+                self.setWindowTitle(f"{title} - Nexium Browser")
         
         # Start downloading the logo
         self.logo_url = "https://nexucore.github.io/Nexium/nexium_icon.png"
-        self.network_manager.get(QNetworkRequest(QUrl(self.logo_url)))
+        logo_reply = self.network_manager.get(QNetworkRequest(QUrl(self.logo_url)))
+        logo_reply.finished.connect(lambda: self.logo_downloaded(logo_reply))
+        
+        # New windows cascade from the last one
+        offset = 30 * len(context.windows)
+        self.setGeometry(100 + offset, 100 + offset, 1200, 800)
         
-        self.setGeometry(100, 100, 1200, 800)
+        self.tab_updates = TabUpdateCoalescer(self)
+        self.tab_index = context.tab_index
+        self.closed_tabs = ClosedTabPool(self)
+        self.load_scheduler = LoadScheduler(self)
+        self.task_manager = None
         
         self.init_ui()
-        self.add_new_tab(home=True)
+
+    def closeEvent(self, event):
+        """Let the context save the session when the last window goes away"""
+        self.closed_tabs.clear()
+        self.preconnector.drop_hint_pages()
+        self.context.window_closing(self)
+        super().closeEvent(event)
 
     def logo_downloaded(self, reply):
         """Handle downloaded logo"""
+        reply.deleteLater()
         if reply.error():
             print("Failed to download logo:", reply.errorString())
             return
@@ -200,12 +4135,18 @@ class SynaxBrowser(QMainWindow):
 
     def setup_tabs(self):
         """Initialize tab widget"""
-        self.tabs = QTabWidget()
+        self.tabs = BrowserTabWidget(self)
         self.tabs.setTabsClosable(True)
         self.tabs.setMovable(True)
         self.tabs.tabCloseRequested.connect(self.close_tab)
+        self.tabs.tabBarClicked.connect(lambda index: self.thumbnails.tab_clicked(self, index))
         self.tabs.currentChanged.connect(self.update_url_bar)
+        self.tabs.currentChanged.connect(lambda index: self.watchdog.tab_activated(self, index))
+        self.tabs.currentChanged.connect(self.load_scheduler.tab_activated)
+        self.tabs.currentChanged.connect(
+            lambda index: index >= 0 and self.tab_index.touch(self.tabs.widget(index)))
         self.setCentralWidget(self.tabs)
+        self.tab_panel = VerticalTabPanel(self)
 
     def create_menu_bar(self):
         """Create the main menu bar"""
@@ -217,15 +4158,28 @@ class SynaxBrowser(QMainWindow):
         new_tab_action.triggered.connect(self.add_new_tab)
         file_menu.addAction(new_tab_action)
         
+        new_window_action = QAction(QIcon.fromTheme("window-new"), 'New &Window', self)
+        new_window_action.setShortcut('Ctrl+N')
+        new_window_action.triggered.connect(lambda: self.context.new_window().add_new_tab(home=True))
+        file_menu.addAction(new_window_action)
+        
         close_tab_action = QAction(QIcon.fromTheme("tab-close"), '&Close Tab', self)
         close_tab_action.setShortcut('Ctrl+W')
         close_tab_action.triggered.connect(self.close_current_tab)
         file_menu.addAction(close_tab_action)
         
+        reopen_tab_action = QAction(QIcon.fromTheme("edit-undo"), '&Reopen Closed Tab', self)
+        reopen_tab_action.setShortcut('Ctrl+Shift+T')
+        reopen_tab_action.triggered.connect(self.closed_tabs.reopen)
+        file_menu.addAction(reopen_tab_action)
+        
+        self.container_menu = file_menu.addMenu(QIcon.fromTheme("folder-new"), 'New C&ontainer Tab')
+        self.container_menu.aboutToShow.connect(self.fill_container_menu)
+        
         file_menu.addSeparator()
         exit_action = QAction(QIcon.fromTheme("application-exit"), '&Exit', self)
         exit_action.setShortcut('Ctrl+Q')
-        exit_action.triggered.connect(self.close)
+        exit_action.triggered.connect(self.context.quit)
         file_menu.addAction(exit_action)
         
         nav_menu = menu_bar.addMenu('&Navigation')
@@ -248,6 +4202,44 @@ class SynaxBrowser(QMainWindow):
         home_action.setShortcut('Alt+Home')
         home_action.triggered.connect(self.go_home)
         nav_menu.addAction(home_action)
+        
+        history_action = QAction(QIcon.fromTheme("document-open-recent"), '&History', self)
+        history_action.setShortcut('Ctrl+H')
+        history_action.triggered.connect(self.show_history)
+        nav_menu.addAction(history_action)
+        
+        view_menu = menu_bar.addMenu('&View')
+        overview_action = QAction(QIcon.fromTheme("view-grid"), 'Tab &Overview', self)
+        overview_action.setShortcut('Ctrl+Shift+O')
+        overview_action.triggered.connect(self.show_tab_overview)
+        view_menu.addAction(overview_action)
+        
+        switcher_action = QAction(QIcon.fromTheme("edit-find"), '&Switch to Tab...', self)
+        switcher_action.setShortcut('Ctrl+K')
+        switcher_action.triggered.connect(self.show_tab_switcher)
+        view_menu.addAction(switcher_action)
+        
+        vertical_tabs_action = self.tab_panel.toggleViewAction()
+        vertical_tabs_action.setText('&Vertical Tabs')
+        vertical_tabs_action.setShortcut('Ctrl+Shift+,')
+        view_menu.addAction(vertical_tabs_action)
+        
+        theme_menu = view_menu.addMenu('&Theme')
+        theme_group = QActionGroup(self)
+        self.theme_actions = {}
+        for name in THEMES:
+            theme_action = theme_group.addAction(name.capitalize())
+            theme_action.setCheckable(True)
+            theme_action.setChecked(name == self.context.theme)
+            theme_action.triggered.connect(lambda checked, name=name: self.set_theme(name))
+            theme_menu.addAction(theme_action)
+            self.theme_actions[name] = theme_action
+        
+        tools_menu = menu_bar.addMenu('&Tools')
+        task_manager_action = QAction(QIcon.fromTheme("utilities-system-monitor"), '&Task Manager', self)
+        task_manager_action.setShortcut('Shift+Esc')
+        task_manager_action.triggered.connect(self.show_task_manager)
+        tools_menu.addAction(task_manager_action)
 
     def create_custom_toolbar(self):
         """Create a custom toolbar layout with URL bar on top and buttons below"""
@@ -286,6 +4278,9 @@ class SynaxBrowser(QMainWindow):
         self.url_bar.setPlaceholderText("Search or enter website address")
         self.url_bar.returnPressed.connect(self.navigate_to_url)
         url_layout.addWidget(self.url_bar)
+        self.url_completer = UrlBarCompleter(self)
+        self.preconnector = Preconnector(self)
+        self.prerenderer = Prerenderer(self)
         
         # Navigation buttons container (bottom)
         nav_container = QFrame()
@@ -322,17 +4317,6 @@ class SynaxBrowser(QMainWindow):
             btn.setDefaultAction(action)
             btn.setToolButtonStyle(Qt.ToolButtonTextUnderIcon)
             btn.setIconSize(QSize(24, 24))
-            btn.setStyleSheet("""
-                QToolButton {
-                    padding: 5px 10px;
-                    border-radius: 5px;
-                    color: #fff;
-                    background: transparent;
-                }
-                QToolButton:hover {
-                    background: #404040;
-                }
-            """)
             nav_layout.addWidget(btn)
         
         # Center the navigation buttons
@@ -344,15 +4328,9 @@ class SynaxBrowser(QMainWindow):
         
         # Add the custom toolbar to the main window
         toolbar = QToolBar("Main Toolbar")
+        toolbar.setObjectName("main-toolbar")
         toolbar.setMovable(False)
         toolbar.addWidget(toolbar_container)
-        toolbar.setStyleSheet("""
-            QToolBar {
-                background: #252525;
-                border: none;
-                padding: 0;
-            }
-        """)
         self.addToolBar(Qt.TopToolBarArea, toolbar)
 
     def setup_shortcuts(self):
@@ -369,108 +4347,167 @@ class SynaxBrowser(QMainWindow):
         self.shortcut_prev_tab = QShortcut(QKeySequence("Ctrl+Shift+Tab"), self)
         self.shortcut_prev_tab.activated.connect(self.previous_tab)
 
+        self.shortcut_flight_dump = QShortcut(QKeySequence("Ctrl+Shift+D"), self)
+        self.shortcut_flight_dump.activated.connect(self.dump_flight_recorder)
+
+    def show_history(self):
+        """Open the history panel"""
+        HistoryPanel(self).show()
+
+    def show_tab_switcher(self):
+        """Open the fuzzy tab switcher"""
+        switcher = TabSwitcher(self)
+        switcher.show()
+        switcher.search_box.setFocus()
+
+    def show_tab_overview(self):
+        """Open the tab thumbnail grid"""
+        TabOverview(self).show()
+
+    def show_task_manager(self):
+        """Open (or raise) the task manager"""
+        if self.task_manager is None:
+            self.task_manager = TaskManager(self)
+        self.task_manager.show()
+        self.task_manager.raise_()
+
+    def dump_flight_recorder(self):
+        """Write the flight recorder buffer on request"""
+        if path := flight_recorder.dump("hotkey", force=True):
+            self.statusBar().showMessage(f"Flight recorder saved to {path}", 5000)
+
     def apply_styles(self):
         """Apply custom styles to the application"""
-        self.setStyleSheet("""
-            QMainWindow {
-                background-color: #1e1e1e;
-                color: #fff;
-            }
-            QTabWidget::pane {
-                border: 0;
-                background: #252525;
-            }
-            QTabBar::tab {
-                background: #333;
-                color: #fff;
-                padding: 8px 15px;
-                border-top-left-radius: 5px;
-                border-top-right-radius: 5px;
-                margin-right: 2px;
-                font-size: 12px;
-                min-width: 100px;
-            }
-            QTabBar::tab:selected {
-                background: #505050;
-                border-bottom: 2px solid #4CAF50;
-            }
-            QTabBar::tab:hover {
-                background: #404040;
-            }
-            QLineEdit {
-                background: #333;
-                color: #fff;
-                border: 1px solid #444;
-                border-radius: 15px;
-                padding: 8px 15px;
-                font-size: 14px;
-                selection-background-color: #4CAF50;
-            }
-            QMenuBar {
-                background: #252525;
-                color: #fff;
-                padding: 4px;
-            }
-            QMenuBar::item {
-                background: transparent;
-                padding: 5px 10px;
-                border-radius: 4px;
-            }
-            QMenuBar::item:selected {
-                background: #404040;
-            }
-            QMenu {
-                background: #333;
-                color: #fff;
-                border: 1px solid #444;
-                padding: 8px;
-            }
-            QMenu::item {
-                padding: 5px 25px 5px 20px;
-                border-radius: 4px;
-            }
-            QMenu::item:selected {
-                background: #4CAF50;
-                color: #fff;
-            }
-            QMenu::separator {
-                height: 1px;
-                background: #444;
-                margin: 5px 0;
-            }
-        """)
+        # The stylesheet is set once on the application, not per window
+        theme_engine.apply(self.context.theme)
 
-    def add_new_tab(self, url=None, home=False):
+    def set_theme(self, name):
+        self.context.set_theme(name)
+
+    def add_new_tab(self, url=None, home=False, container=None):
         """Add a new browser tab"""
-        new_tab = BrowserTab(self.profile, self)
+        new_tab = self.create_tab(container)
         
         if home:
-            target_url = QUrl("https://nexucore.github.io/Synax/")
+            target_url = QUrl(HOME_URL)
         elif url:
             target_url = QUrl(url) if isinstance(url, str) else url
         else:
-            target_url = QUrl("https://nexucore.github.io/Synax/")
+            target_url = QUrl(HOME_URL)
+        
+        self.attach_tab(new_tab)
+        new_tab.browser.setUrl(target_url)
+        return new_tab
+
+    def fill_container_menu(self):
+        """List the known containers, plus an entry for starting a new one"""
+        self.container_menu.clear()
+        for name in self.context.containers.names():
+            action = self.container_menu.addAction(name)
+            action.triggered.connect(lambda checked, name=name: self.add_new_tab(home=True, container=name))
+        self.container_menu.addSeparator()
+        self.container_menu.addAction("New Container...").triggered.connect(self.new_container_tab)
+
+    def new_container_tab(self):
+        name, ok = QInputDialog.getText(self, "New Container", "Container name:")
+        name = name.strip()
+        if not ok or not name:
+            return
+        if not ContainerProfiles.valid_name(name):
+            QMessageBox.warning(self, "New Container", "Container names can only use letters, "
+                                "digits, spaces, '-' and '_'.")
+            return
+        self.add_new_tab(home=True, container=name)
+
+    def create_tab(self, container=None):
+        """Create a browser tab watched by the renderer health monitors"""
+        if container:
+            containers = self.context.containers
+            # Sessions from older versions may hold names that aren't directory names
+            container = containers.directory_name(container)
+            new_tab = BrowserTab(containers.acquire(container), self)
+            new_tab.container = new_tab.page.container = container
+            new_tab.destroyed.connect(lambda: containers.release(container))
+        else:
+            # Spare pages are all on the default profile
+            new_tab = BrowserTab(self.profile, self, self.spare_pages.take())
+        self.watchdog.watch(new_tab)
+        self.hang_detector.watch(new_tab)
+        return new_tab
+
+    def attach_tab(self, new_tab, index=None, activate=True):
+        """Show a tab in the tab strip and keep its title, icon and URL in sync"""
+        new_tab.page.browser_window = self
+        # Reopened tabs, and tabs dragged in from another window, are already connected
+        if not new_tab.attached:
+            new_tab.attached = True
+            new_tab.page.windowCloseRequested.connect(
+                lambda: new_tab.page.browser_window.close_tab_widget(new_tab))
+            self.context.watch(new_tab)
+            TabUpdateCoalescer.watch(new_tab)
         
-        index = self.tabs.addTab(new_tab, "New Tab")
-        self.tabs.setCurrentIndex(index)
+        if index is None:
+            index = self.tabs.addTab(new_tab, "New Tab")
+        else:
+            index = self.tabs.insertTab(index, new_tab, "New Tab")
+        if new_tab.container:
+            # The stylesheet sets the tab text colour, so the bar paints a stripe instead
+            self.tabs.tabBar().setTabData(index, new_tab.container)
+            self.tabs.setTabToolTip(index, f"Container: {new_tab.container}")
+        self.tab_panel.tab_added(new_tab)
+        if activate:
+            self.tabs.setCurrentIndex(index)
         
-        def update_title(title):
-            self.tabs.setTabText(index, title[:20] + "..." if len(title) > 20 else title)
-            self.setWindowTitle(f"Nexium - {title}")
+        self.tab_updates.refresh(new_tab)
+        return index
+
+    @staticmethod
+    def is_fresh_tab(tab):
+        """True if the tab shows only the home page or nothing, with no history to lose"""
+        history = tab.browser.history()
+        url = tab.browser.url().toString()
+        return not history.canGoBack() and not history.canGoForward() \
+            and url in ("", "about:blank", HOME_URL)
+
+    def swap_in_tab(self, new_tab):
+        """Replace the current (fresh) tab with an already loaded one"""
+        old_index = self.tabs.currentIndex()
+        old_tab = self.tabs.widget(old_index)
+        self.attach_tab(new_tab, old_index)
         
-        def update_icon(icon):
-            self.tabs.setTabIcon(index, icon)
-            
-        def update_url(qurl):
-            if qurl.toString() != "about:blank":
-                self.url_bar.setText(qurl.toString())
+        # The visit happened before history was watching the tab
+        url = new_tab.browser.url()
+        self.history.record_visit(new_tab, url)
+        self.history.record_title(new_tab)
+        self.context.tab_url_changed(new_tab, url)
+        self.url_bar.setText(url.toString())
+        # The replaced tab was empty; keep it out of the closed tab pool
+        if old_tab:
+            self.context.tab_closed(old_tab)
+            self.detach_tab(old_tab)
+            old_tab.deleteLater()
 
-        new_tab.browser.titleChanged.connect(update_title)
-        new_tab.browser.iconChanged.connect(update_icon)
-        new_tab.browser.urlChanged.connect(update_url)
+    def create_window_page(self, opener, window_type):
+        """Make the page for a window another page asked to open"""
+        # Windows a container page opens stay in its container
+        if window_type in (QWebEnginePage.WebBrowserWindow, QWebEnginePage.WebDialog):
+            return PopupWindow(self, opener.container).tab.page
         
-        new_tab.browser.setUrl(target_url)
-        return new_tab
+        # New tabs go right after the tab that opened them
+        index = next((i + 1 for i in range(self.tabs.count())
+                      if self.tabs.widget(i).page is opener), self.tabs.count())
+        new_tab = self.create_tab(opener.container)
+        if window_type == QWebEnginePage.WebBrowserBackgroundTab:
+            self.load_scheduler.defer(new_tab)
+            self.attach_tab(new_tab, index, activate=False)
+        else:
+            self.attach_tab(new_tab, index)
+        return new_tab.page
+
+    def close_tab_widget(self, tab):
+        """Close a tab a page asked to close, if it is still in this window"""
+        if (index := self.tabs.indexOf(tab)) >= 0:
+            self.close_tab(index)
 
     def close_current_tab(self):
         """Close the currently active tab"""
@@ -478,11 +4515,31 @@ class SynaxBrowser(QMainWindow):
 
     def close_tab(self, index):
         """Close tab at specified index"""
-        if self.tabs.count() > 1:
-            widget = self.tabs.widget(index)
-            if widget:
-                widget.deleteLater()
-            self.tabs.removeTab(index)
+        if self.tabs.count() > 1 and (widget := self.tabs.widget(index)):
+            self.context.tab_closed(widget)
+            self.detach_tab(widget)
+            self.closed_tabs.add(widget, index)
+
+    def detach_tab(self, tab):
+        """Take a tab out of this window without closing it"""
+        self.tab_updates.discard(tab)
+        self.tab_panel.tab_removed(tab)
+        self.load_scheduler.forget(tab)
+        self.tabs.removeTab(self.tabs.indexOf(tab))
+
+    def drag_tab(self, tab):
+        """Drag a tab to another window's tab bar, or out into a window of its own"""
+        mime_data = QMimeData()
+        mime_data.setData(BrowserContext.TAB_MIME_TYPE, str(tab.tab_id).encode())
+        drag = QDrag(self.tabs.tabBar())
+        drag.setMimeData(mime_data)
+        drag.setPixmap(tab.browser.grab().scaled(ThumbnailCache.WIDTH, ThumbnailCache.HEIGHT,
+                                                 Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        if drag.exec_(Qt.MoveAction) == Qt.IgnoreAction and self.tabs.count() > 1 \
+                and self.tabs.indexOf(tab) >= 0:
+            window = self.context.new_window()
+            window.move(QCursor.pos())
+            self.context.move_tab(tab, window)
 
     def next_tab(self):
         """Switch to next tab"""
@@ -499,10 +4556,34 @@ class SynaxBrowser(QMainWindow):
         current_widget = self.tabs.currentWidget()
         return current_widget.browser if current_widget else None
 
+    def switch_to_url(self, url):
+        """Activate an open tab showing url; returns False if there is none"""
+        key = OmniboxIndex.normalize(url)
+        for i in range(self.tabs.count()):
+            if OmniboxIndex.normalize(self.tabs.widget(i).browser.url().toString()) == key:
+                self.tabs.setCurrentIndex(i)
+                return True
+        return False
+
     def navigate_to_url(self):
         """Navigate to URL in address bar"""
-        url_or_query = self.url_bar.text().strip()
+        if self.url_completer.suppress_return:
+            return
+        self.navigate_current_tab(self.url_bar.text().strip())
+
+    def navigate_current_tab(self, url_or_query):
+        """Load input from the URL bar, using a prerendered page when one matches"""
         if current_tab := self.tabs.currentWidget():
+            if tracer.enabled:
+                tracer.instant("url_bar.returnPressed", current_tab.tab_id)
+            if url := url_resolver.resolve(url_or_query):
+                self.preconnector.navigation_started(url)
+                # Prerendering happens on the default profile, and a swapped-in
+                # tab has no back history, so only a fresh tab is replaced
+                if not current_tab.container and self.is_fresh_tab(current_tab) \
+                        and (prerendered := self.prerenderer.take(url)):
+                    self.swap_in_tab(prerendered)
+                    return
             current_tab.navigate_to(url_or_query)
 
     def go_back(self):
@@ -521,17 +4602,263 @@ class SynaxBrowser(QMainWindow):
             browser.reload()
 
     def update_url_bar(self, index):
-        """Update URL bar when tab changes"""
+        """Update URL bar and window title when tab changes"""
         if index >= 0 and (current_widget := self.tabs.widget(index)):
             self.url_bar.setText(current_widget.browser.url().toString())
+            # Background tabs don't touch the window title, so catch up here
+            if title := current_widget.browser.title():
+                self.setWindowTitle(f"Nexium - {title}")
 
     def go_home(self):
         """Navigate to home page"""
         if browser := self.current_browser():
-            browser.setUrl(QUrl("https://nexucore.github.io/Synax/"))
+            browser.setUrl(QUrl(HOME_URL))
+
+
+def benchmark_omnibox():
+    """Check URL bar suggestion latency against a 300k entry history"""
+    budget_ms = 1.0
+    rng = random.Random(0)
+    words = ["dashboard", "grafana", "jira", "confluence", "status", "metrics", "report",
+             "sales", "kiosk", "intranet", "wiki", "login", "admin", "deploy", "build",
+             "pipeline", "monitor", "queue", "orders", "users", "search", "calendar",
+             "mail", "docs", "inventory", "tickets", "alerts", "camera", "floor", "shift"]
+    hosts = [f"{rng.choice(words)}{i}.{rng.choice(['example.com', 'corp.local', 'io'])}"
+             for i in range(5000)]
+    now = time.time()
+    rows = [(f"https://{rng.choice(hosts)}/{rng.choice(words)}/{rng.choice(words)}/{i}",
+             " ".join(rng.choices(words, k=5)), rng.randint(1, 50),
+             now - rng.random() * 120 * 86400) for i in range(300000)]
+    
+    start = time.perf_counter()
+    index = OmniboxIndex()
+    index.load(rows)
+    print(f"Built index of {len(index.entries)} entries in {time.perf_counter() - start:.2f}s")
+    
+    queries = []
+    for _ in range(5000):
+        word = rng.choice(words + hosts)
+        queries.append(word[:rng.randint(1, len(word))])
+    # Every prefix of a typed word, as it would arrive keystroke by keystroke
+    for word in rng.sample(words, 10):
+        queries.extend(word[:n] for n in range(1, len(word) + 1))
+    
+    latencies = []
+    for query in queries:
+        start = time.perf_counter_ns()
+        index.query(query)
+        latencies.append((time.perf_counter_ns() - start) / 1e6)
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(f"{len(queries)} queries: p50 {p50:.3f}ms, p99 {p99:.3f}ms, max {latencies[-1]:.3f}ms")
+    if p99 > budget_ms:
+        print(f"FAIL: p99 exceeds the {budget_ms}ms budget")
+        return 1
+    return 0
+
+
+# A typical mix of URL bar input; correctness is covered by tests/test_url_resolver.py
+RESOLVER_INPUTS = [
+    "example.com", "news.bbc.co.uk/world", "https://example.com/a", "localhost:8080",
+    "192.168.1.10:3000", "[::1]:8080", "grafana:3000/d/abc", "wiki/Main_Page",
+    "jenkins.mycompany/job/1", "printer.local", "known-host", "v2.1 release", "hello",
+    "what is a.b", "user@example.com", "example.unknowntld", "file.txt", "b\u00fccher.de",
+]
+
+
+def benchmark_resolver():
+    """Time URL bar input resolution"""
+    resolver = UrlResolver()
+    resolver.known_scheme = {"known-host": "https"}.get
+    
+    inputs = RESOLVER_INPUTS * 10000
+    start = time.perf_counter()
+    for text in inputs:
+        resolver.resolve(text)
+    per_call_us = (time.perf_counter() - start) / len(inputs) * 1e6
+    print(f"{len(inputs)} resolutions: {per_call_us:.2f}us per input")
+    
+    start = time.perf_counter()
+    UrlResolver()
+    print(f"Compiling built-in suffix trie: {(time.perf_counter() - start) * 1000:.2f}ms")
+    return 0
+
+
+TITLE_STORM_PAGE = """<html><head><title>0</title></head><body><script>
+let n = 0;
+function storm() {
+    for (let i = 0; i < 20; i++) document.title = "Storm " + (++n);
+    setTimeout(storm, 0);
+}
+storm();
+</script></body></html>"""
+
+
+def benchmark_ui_updates(tab_count=20, seconds=10):
+    """Measure event loop lag while every tab rewrites its title in a tight loop"""
+    budget_ms = 50.0
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    # Keeps the benchmark's history and profile out of the real data directory
+    QStandardPaths.setTestModeEnabled(True)
+    app = QApplication.instance() or QApplication(sys.argv)
+    context = BrowserContext()
+    window = context.new_window()
+    for _ in range(tab_count):
+        window.add_new_tab("about:blank")
+    for i in range(tab_count):
+        window.tabs.widget(i).browser.setHtml(TITLE_STORM_PAGE, QUrl("http://storm.localhost/"))
+    
+    # A frame-rate timer fires late by however long the GUI thread was busy
+    lags = []
+    ticker = QTimer()
+    ticker.setTimerType(Qt.PreciseTimer)
+    last_tick = [time.perf_counter()]
+    
+    def tick():
+        now = time.perf_counter()
+        lags.append(max(0.0, (now - last_tick[0]) * 1000 - ticker.interval()))
+        last_tick[0] = now
+    ticker.timeout.connect(tick)
+    ticker.start(16)
+    QTimer.singleShot(int(seconds * 1000), app.quit)
+    app.exec_()
+    ticker.stop()
+    
+    updates = window.tab_updates
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99)] if lags else 0.0
+    print(f"{tab_count} tabs for {seconds}s: {updates.signals_seen} change signals, "
+          f"{updates.updates_applied} applied ({updates.signals_seen / max(1, updates.updates_applied):.1f}x coalesced)")
+    print(f"Event loop lag: p50 {lags[len(lags) // 2] if lags else 0.0:.2f}ms, p99 {p99:.2f}ms")
+    window.close()
+    if p99 > budget_ms:
+        print(f"FAIL: p99 lag exceeds the {budget_ms}ms budget")
+        return 1
+    return 0
+
+
+def benchmark_tab_list(tab_count=5000):
+    """Time layout, filtering and scrolling of the vertical tab list"""
+    budget_ms = 16.0
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication.instance() or QApplication(sys.argv)
+    rng = random.Random(0)
+    sites = [f"site{i}.example.com" for i in range(200)]
+    
+    model = TabListModel()
+    view = QListView()
+    view.setModel(model)
+    view.setItemDelegate(TabListDelegate(view))
+    view.setUniformItemSizes(True)
+    view.resize(300, 900)
+    view.show()
+    
+    def timed(label, fn):
+        start = time.perf_counter()
+        fn()
+        app.processEvents()
+        view.viewport().repaint()
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{label}: {elapsed:.1f}ms")
+        return elapsed
+    
+    def populate():
+        for i in range(tab_count):
+            site = rng.choice(sites)
+            model.add(object(), f"Page {i} on {site}", f"https://{site}/page/{i}")
+        model.rebuild()
+    
+    timed(f"Add {tab_count} tabs and lay out", populate)
+    timed("Group by site", lambda: model.set_grouped(True))
+    timed("Filter", lambda: model.set_filter("site1"))
+    timed("Clear filter", lambda: model.set_filter(""))
+    
+    scrollbar = view.verticalScrollBar()
+    frames = []
+    for value in range(0, scrollbar.maximum(), max(1, scrollbar.maximum() // 500)):
+        start = time.perf_counter()
+        scrollbar.setValue(value)
+        view.viewport().repaint()
+        frames.append((time.perf_counter() - start) * 1000)
+    frames.sort()
+    p99 = frames[int(len(frames) * 0.99)]
+    print(f"{len(frames)} scroll steps: p50 {frames[len(frames) // 2]:.2f}ms, p99 {p99:.2f}ms")
+    
+    keys = list(model.by_key)
+    start = time.perf_counter()
+    for i in range(10000):
+        model.update(rng.choice(keys), title=f"Retitled {i}")
+    app.processEvents()
+    print(f"10000 title updates: {(time.perf_counter() - start) * 1000:.1f}ms")
+    if p99 > budget_ms:
+        print(f"FAIL: p99 scroll frame exceeds the {budget_ms}ms budget")
+        return 1
+    return 0
+
+
+def benchmark_theme(tab_count=200):
+    """Time style polishing while opening tabs, and a full theme switch"""
+    budget_ms = 100.0
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    QStandardPaths.setTestModeEnabled(True)
+    app = QApplication.instance() or QApplication(sys.argv)
+    
+    start = time.perf_counter()
+    for name in THEMES:
+        theme_engine.stylesheet(name)
+    print(f"Compile {len(THEMES)} themes: {(time.perf_counter() - start) * 1000:.2f}ms")
+    
+    context = BrowserContext()
+    start = time.perf_counter()
+    window = context.new_window()
+    window.show()
+    app.processEvents()
+    print(f"Open and polish a window: {(time.perf_counter() - start) * 1000:.1f}ms")
+    
+    start = time.perf_counter()
+    for _ in range(tab_count):
+        window.add_new_tab("about:blank")
+    app.processEvents()
+    print(f"Open and polish {tab_count} tabs: {(time.perf_counter() - start) * 1000:.1f}ms")
+    
+    switches = []
+    for name in list(THEMES) * 3:
+        start = time.perf_counter()
+        context.set_theme(name)
+        app.processEvents()
+        switches.append((time.perf_counter() - start) * 1000)
+    switches.sort()
+    worst = switches[-1]
+    print(f"{len(switches)} theme switches: p50 {switches[len(switches) // 2]:.1f}ms, worst {worst:.1f}ms")
+    window.close()
+    if worst > budget_ms:
+        print(f"FAIL: theme switch exceeds the {budget_ms}ms budget")
+        return 1
+    return 0
+
+
+BENCHMARKS = {
+    "omnibox": benchmark_omnibox,
+    "resolver": benchmark_resolver,
+    "ui_updates": benchmark_ui_updates,
+    "tab_list": benchmark_tab_list,
+    "theme": benchmark_theme,
+}
+
+
+def run_benchmark(name):
+    """Run a named benchmark and return its exit status"""
+    if name not in BENCHMARKS:
+        print(f"Unknown benchmark {name!r}; available: {', '.join(sorted(BENCHMARKS))}")
+        return 2
+    return BENCHMARKS[name]()
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--benchmark":
+        sys.exit(run_benchmark(sys.argv[2]))
+    
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
     app.setApplicationName("Nexium Browser")
@@ -543,6 +4870,12 @@ if __name__ == "__main__":
     if not os.path.exists(data_path):
         os.makedirs(data_path)
     
-    window = SynaxBrowser()
-    window.show()
+    # Opt-in Prometheus endpoint for unattended displays
+    if metrics_port := env_number("NEXIUM_METRICS_PORT", 0):
+        start_metrics_exporter(metrics_port)
+    
+    sys.excepthook = record_unhandled_exception
+    
+    context = BrowserContext()
+    context.start()
     sys.exit(app.exec_())
@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("PyQt5.QtWebEngineWidgets")
+
+import main  # noqa: E402
+
+
+@pytest.mark.parametrize("url", [
+    "https://grafana.example.com/",
+    "https://grafana.example.com/d/orders",
+    "http://intranet/wiki/Main_Page",
+    "https://example.com/payroll/report",
+])
+def test_landing_pages_are_warmed(url):
+    assert main.CacheWarmer.is_landing_page(url)
+
+
+@pytest.mark.parametrize("url", [
+    "https://example.com/logout",
+    "https://example.com/sign-out.php",
+    "https://example.com/user/delete/5",
+    "https://example.com/mail/unsubscribe",
+    "https://example.com/search?q=orders",
+    "https://example.com/?action=archive",
+    "file:///home/kiosk/index.html",
+    "ftp://files.example.com/",
+])
+def test_actions_and_queries_are_not_warmed(url):
+    assert not main.CacheWarmer.is_landing_page(url)
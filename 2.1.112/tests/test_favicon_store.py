@@ -0,0 +1,76 @@
+import pytest
+
+pytest.importorskip("PyQt5.QtWebEngineWidgets")
+
+import main  # noqa: E402
+
+
+class Icons:
+    """Favicon keys and host votes, as FaviconStore keeps them"""
+
+    def __init__(self, keys=None):
+        self.keys = dict(keys or {})
+        self.votes = {}
+
+    def settle(self, page, digest, host="intra"):
+        return main.FaviconStore.remap(self.keys, self.votes, host, page, digest)
+
+
+def test_first_icon_claims_the_host():
+    icons = Icons()
+    assert icons.settle("http://intra/app1", "A") == (["intra"], [])
+    assert icons.keys == {"intra": "A"}
+
+
+def test_pages_with_other_icons_get_their_own_key():
+    icons = Icons()
+    icons.settle("http://intra/app1", "A")
+    assert icons.settle("http://intra/app2", "B") == (["http://intra/app2"], [])
+    assert icons.keys == {"intra": "A", "http://intra/app2": "B"}
+
+
+def test_apps_sharing_a_host_keep_their_icons():
+    icons = Icons()
+    for _ in range(5):
+        icons.settle("http://intra/app1", "A")
+        icons.settle("http://intra/app2", "B")
+    assert icons.settle("http://intra/app1", "A") == ([], [])
+    assert icons.settle("http://intra/app2", "B") == ([], [])
+    assert icons.keys == {"intra": "A", "http://intra/app2": "B"}
+
+
+def test_one_odd_icon_does_not_take_over_the_host():
+    icons = Icons({"intra": "A"})
+    icons.settle("http://intra/inbox", "badge")
+    assert icons.keys["intra"] == "A"
+    assert icons.keys["http://intra/inbox"] == "badge"
+
+
+def test_host_follows_a_rebrand():
+    icons = Icons({"intra": "A"})
+    icons.settle("http://intra/", "new")
+    changed, _ = icons.settle("http://intra/", "new")
+    assert changed == ["intra"]
+    assert icons.keys == {"intra": "new"}
+    # Pages now showing the new icon need no key of their own
+    icons.keys["http://intra/about"] = "old-page-key"
+    assert icons.settle("http://intra/about", "new") == ([], ["http://intra/about"])
+
+
+def test_page_matching_its_host_drops_its_key():
+    icons = Icons({"intra": "A", "http://intra/app2": "B"})
+    assert icons.settle("http://intra/app2", "A") == ([], ["http://intra/app2"])
+    assert icons.keys == {"intra": "A"}
+
+
+def test_page_icon_change_replaces_its_key():
+    icons = Icons({"intra": "A", "http://intra/app2": "B"})
+    assert icons.settle("http://intra/app2", "C") == (["http://intra/app2"], [])
+    assert icons.keys["http://intra/app2"] == "C"
+
+
+def test_hosts_vote_separately():
+    icons = Icons()
+    icons.settle("http://intra/", "A")
+    icons.settle("http://wiki/", "W", host="wiki")
+    assert icons.keys == {"intra": "A", "wiki": "W"}
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+pytest.importorskip("PyQt5.QtWebEngineWidgets")
+
+import main  # noqa: E402
+
+DAY = 86400
+
+
+def test_frecency_prefers_recent_visits():
+    now = time.time()
+    assert main.frecency(3, now - DAY, now) == 300
+    assert main.frecency(3, now - 20 * DAY, now) == 150
+    assert main.frecency(3, now - 400 * DAY, now) == 30
+
+
+def test_normalize():
+    assert main.OmniboxIndex.normalize(" HTTPS://www.Example.com/ ") == "example.com"
+    assert main.OmniboxIndex.normalize("http://intranet/wiki/") == "intranet/wiki"
+
+
+@pytest.fixture
+def index():
+    now = time.time()
+    index = main.OmniboxIndex()
+    index.load([
+        ("https://grafana.example.com/d/orders", "Orders dashboard", 40, now - DAY),
+        ("https://grafana.example.com/d/users", "Users dashboard", 2, now - 60 * DAY),
+        ("https://jira.example.com/browse/OPS-1", "Disk full on kiosk", 5, now - DAY),
+        ("http://intranet/wiki/Main_Page", "Intranet wiki", 1, now - 200 * DAY),
+    ])
+    return index
+
+
+def test_query_matches_word_prefixes(index):
+    assert [e.url for e in index.query("graf")][0] == "https://grafana.example.com/d/orders"
+    assert [e.title for e in index.query("dash users")] == ["Users dashboard"]
+    assert [e.title for e in index.query("kio")] == ["Disk full on kiosk"]
+
+
+def test_query_ranks_by_frecency(index):
+    urls = [e.url for e in index.query("dashboard")]
+    assert urls == ["https://grafana.example.com/d/orders",
+                    "https://grafana.example.com/d/users"]
+
+
+def test_query_ignores_blank_and_unmatched_input(index):
+    assert index.query("   ") == []
+    assert index.query("nothingmatches") == []
+
+
+def test_open_tabs_rank_higher():
+    now = time.time()
+    index = main.OmniboxIndex()
+    index.load([("https://a.example.com/report", "Sales report", 3, now - DAY),
+                ("https://b.example.com/report", "Stock report", 2, now - DAY)])
+    assert index.query("report")[0].title == "Sales report"
+    index.tab_opened("https://b.example.com/report")
+    assert index.query("report")[0].title == "Stock report"
+    index.tab_closed("https://b.example.com/report")
+    assert index.query("report")[0].title == "Sales report"
+
+
+def test_retitled_entries_are_reindexed(index):
+    index.record_title("https://jira.example.com/browse/OPS-1", "Printer offline")
+    assert index.query("kiosk") == []
+    assert [e.title for e in index.query("printer")] == ["Printer offline"]
+    assert "kiosk" not in index.postings
+
+
+def test_hosts_remember_the_scheme(index):
+    assert index.hosts["grafana.example.com"] == "https"
+    assert index.hosts["intranet"] == "http"
+
+
+def test_merge_adds_visits_and_open_tabs(index):
+    other = main.OmniboxIndex()
+    other.record_visit("https://status.example.com/", "Status page")
+    other.tab_opened("https://status.example.com/")
+    index.merge(other)
+    entry = index.entries["status.example.com"]
+    assert (entry.visit_count, entry.open_count, entry.title) == (1, 1, "Status page")
+    assert [e.url for e in index.query("status")] == ["https://status.example.com/"]
@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip("PyQt5.QtWebEngineWidgets")
+
+import main  # noqa: E402
+
+
+@pytest.fixture
+def index():
+    index = main.TabSwitcherIndex()
+    index.update("mail", "Inbox - Mail", "https://mail.example.com/")
+    index.update("grafana", "Orders dashboard", "https://grafana.example.com/d/orders")
+    index.update("jira", "OPS-1 Disk full", "https://jira.example.com/browse/OPS-1")
+    return index
+
+
+def test_score_prefers_early_substrings():
+    score = main.TabSwitcherIndex.score
+    assert score("mail", "mail inbox") > score("mail", "inbox - mail")
+    assert score("ord", "orders") > score("ods", "orders")
+    assert score("xyz", "orders") is None
+
+
+def test_substring_beats_subsequence(index):
+    assert index.query("dash")[0] == "grafana"
+    assert index.query("ops-1")[0] == "jira"
+    assert index.query("ordash") == ["grafana"]
+
+
+def test_blank_query_lists_most_recent_first(index):
+    index.touch("jira")
+    index.touch("mail")
+    assert index.query("") == ["mail", "jira", "grafana"]
+
+
+def test_ties_go_to_the_most_recent_tab(index):
+    index.update("status-a", "Status", "https://status.example.com/a")
+    index.update("status-b", "Status", "https://status.example.com/b")
+    index.touch("status-b")
+    index.touch("status-a")
+    assert index.query("status") == ["status-a", "status-b"]
+
+
+def test_narrowing_query_sees_updates(index):
+    assert index.query("ord") == ["grafana"]
+    index.update("mail", "Orders export", "https://mail.example.com/")
+    assert set(index.query("orders")) == {"mail", "grafana"}
+    index.remove("grafana")
+    assert index.query("orders") == ["mail"]
@@ -0,0 +1,122 @@
+from urllib.parse import quote_plus
+
+import pytest
+
+pytest.importorskip("PyQt5.QtWebEngineWidgets")
+
+import main  # noqa: E402
+
+
+def _search(query):
+    return main.SEARCH_URL + quote_plus(query)
+
+
+CASES = [
+    ("example.com", "https://example.com"),
+    ("  example.com  ", "https://example.com"),
+    ("www.example.com", "https://www.example.com"),
+    ("EXAMPLE.COM", "https://EXAMPLE.COM"),
+    ("example.com.", "https://example.com."),
+    ("example.com/path?q=1", "https://example.com/path?q=1"),
+    ("example.com?q=1", "https://example.com?q=1"),
+    ("example.com#top", "https://example.com#top"),
+    ("example.com:8443", "https://example.com:8443"),
+    ("news.bbc.co.uk", "https://news.bbc.co.uk"),
+    ("foo.co.uk", "https://foo.co.uk"),
+    ("user.github.io", "https://user.github.io"),
+    ("xn--bcher-kva.ch", "https://xn--bcher-kva.ch"),
+    ("b\u00fccher.de", "https://b\u00fccher.de"),
+    ("a.foo.ck", "https://a.foo.ck"),
+    ("www.ck", "https://www.ck"),
+    ("https://example.com", "https://example.com"),
+    ("http://intranet", "http://intranet"),
+    ("HTTPS://Example.com/A", "HTTPS://Example.com/A"),
+    ("https://example.com/a b", "https://example.com/a b"),
+    ("ftp://files.example.com", "ftp://files.example.com"),
+    ("file:///home/kiosk/index.html", "file:///home/kiosk/index.html"),
+    ("about:blank", "about:blank"),
+    ("data:text/html,hi", "data:text/html,hi"),
+    ("view-source:https://example.com", "view-source:https://example.com"),
+    ("localhost", "http://localhost"),
+    ("localhost:8080", "http://localhost:8080"),
+    ("localhost:8080/api/v1", "http://localhost:8080/api/v1"),
+    ("app.localhost", "http://app.localhost"),
+    ("127.0.0.1", "http://127.0.0.1"),
+    ("10.0.0.1", "http://10.0.0.1"),
+    ("192.168.1.10:3000", "http://192.168.1.10:3000"),
+    ("192.168.0.1/admin", "http://192.168.0.1/admin"),
+    ("[::1]", "http://[::1]"),
+    ("[::1]:8080", "http://[::1]:8080"),
+    ("[2001:db8::1]/status", "http://[2001:db8::1]/status"),
+    ("grafana:3000", "http://grafana:3000"),
+    ("grafana:3000/d/abc", "http://grafana:3000/d/abc"),
+    ("intranet/", "http://intranet/"),
+    ("wiki/Main_Page", "http://wiki/Main_Page"),
+    ("dashboard.corp", "http://dashboard.corp"),
+    ("printer.local", "http://printer.local"),
+    ("my-app.internal:8443/health", "http://my-app.internal:8443/health"),
+    ("router.home.arpa", "http://router.home.arpa"),
+    ("build.lan/job/1", "http://build.lan/job/1"),
+    ("kiosk-07.example:9000", "https://kiosk-07.example:9000"),
+    ("known-host", "https://known-host"),
+    ("nas", "http://nas"),
+    ("nas/share", "http://nas/share"),
+    ("jenkins.mycompany/job/1", "http://jenkins.mycompany/job/1"),
+    ("jenkins.mycompany:8080", "http://jenkins.mycompany:8080"),
+    ("svn.dev-box/trunk", "http://svn.dev-box/trunk"),
+    ("file.txt/", "http://file.txt/"),
+    ("v2.1 release", _search("v2.1 release")),
+    ("v2.1", _search("v2.1")),
+    ("1.5", _search("1.5")),
+    ("3.14159", _search("3.14159")),
+    ("999.1.1.1", _search("999.1.1.1")),
+    ("10.0.0", _search("10.0.0")),
+    ("hello", _search("hello")),
+    ("hello world", _search("hello world")),
+    ("what is a.b", _search("what is a.b")),
+    ("c++ tutorial", _search("c++ tutorial")),
+    ("a&b=c", _search("a&b=c")),
+    ("q=a+b", _search("q=a+b")),
+    ("50%", _search("50%")),
+    ("#hashtag", _search("#hashtag")),
+    ("?example.com", _search("example.com")),
+    ("foo:bar", _search("foo:bar")),
+    ("host:99999", _search("host:99999")),
+    ("javascript:alert(1)", _search("javascript:alert(1)")),
+    ("user@example.com", _search("user@example.com")),
+    ("example.unknowntld", _search("example.unknowntld")),
+    ("co.uk", _search("co.uk")),
+    ("foo.ck", _search("foo.ck")),
+    ("file.txt", _search("file.txt")),
+    ("co.uk/news", _search("co.uk/news")),
+    ("readme.md", "https://readme.md"),
+    ("site.com/path with spaces", _search("site.com/path with spaces")),
+    ("foo..com", _search("foo..com")),
+    ("-", _search("-")),
+    ("[::1", _search("[::1")),
+    ("[nothex]:80", _search("[nothex]:80")),
+    ("\u00fcber", _search("\u00fcber")),
+    ("", None),
+    ("   ", None),
+]
+
+
+@pytest.fixture
+def resolver():
+    resolver = main.UrlResolver()
+    resolver.known_scheme = {"known-host": "https", "nas": "http"}.get
+    return resolver
+
+
+@pytest.mark.parametrize("text, expected", CASES)
+def test_resolve(resolver, text, expected):
+    assert resolver.resolve(text) == expected
+
+
+def test_suffix_length():
+    trie = main.PublicSuffixTrie(["com", "co.uk", "*.ck", "!www.ck"])
+    assert trie.suffix_length(["example", "com"]) == 1
+    assert trie.suffix_length(["news", "bbc", "co", "uk"]) == 2
+    assert trie.suffix_length(["a", "foo", "ck"]) == 2
+    assert trie.suffix_length(["www", "ck"]) == 1
+    assert trie.suffix_length(["example", "unknowntld"]) == 0